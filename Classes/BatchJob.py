@@ -0,0 +1,129 @@
+import os
+import io
+import json
+import time
+import hashlib
+import threading
+from Classes.LLMGateway import LLMGateway
+from Classes.ResponseCache import ResponseCache
+
+# Offline mode for prompts that do not need an answer right away: the requests are collected into a JSONL job file,
+# submitted through the OpenAI Batch API (half the price of synchronous calls) and polled until the batch is done.
+# Prompts already in the response cache are answered locally and not submitted.
+# The batch id is kept next to the job file, so a restarted run polls the same batch instead of submitting it again.
+class BatchJob():
+    ENDPOINT = "/v1/chat/completions"
+    COMPLETION_WINDOW = "24h"
+    FINAL_STATUSES = ["completed", "failed", "expired", "cancelled"]
+    # Batches that did not complete, those that stopped early still have the results of the requests done until then
+    PARTIAL_STATUSES = ["failed", "expired", "cancelled"]
+
+    def __init__(self, job_filename, client=None, poll_interval_seconds=60):
+        self.__job_filename = job_filename
+        self.__state_filename = f"{os.path.splitext(job_filename)[0]}.batch_id"
+        self.__client = client if client is not None else LLMGateway.get_openai_batch_client()
+        self.__poll_interval_seconds = poll_interval_seconds
+        self.__requests = {}
+        self.__cache_keys = {}
+        self.__answers = {}
+        self.__lock = threading.Lock()
+
+    # Queue one prompt, safe to call from several workers. custom_id must be unique within the job and is the key of the merged answer
+    def add(self, custom_id, model_name, prompt, params=None):
+        params = params or {}
+        messages = [{"role": "user", "content": prompt}]
+
+        # Same key as ChatGPT uses for a single-prompt conversation, so both share cached answers
+        response_cache = LLMGateway.get_response_cache()
+        cache_key = ResponseCache.make_key(model_name, messages, params) if response_cache is not None else None
+        cached_response = response_cache.get(cache_key) if cache_key is not None else None
+
+        with self.__lock:
+            if cached_response is not None:
+                self.__answers[custom_id] = (*cached_response, True)
+                return
+            if cache_key is not None:
+                self.__cache_keys[custom_id] = cache_key
+            self.__requests[custom_id] = {"custom_id": custom_id, "method": "POST", "url": BatchJob.ENDPOINT,
+                                          "body": {"model": model_name, "messages": messages, **params}}
+
+    def get_request_count(self):
+        return len(self.__requests)
+
+    # Submit, wait and merge. Returns {custom_id: (answer, input_tokens, output_tokens, cached)}.
+    # Requests that failed inside the batch, or were not done when it failed, expired or was cancelled, are left out,
+    # the caller can retry them synchronously.
+    def run(self):
+        if not self.__requests:
+            return dict(self.__answers)
+
+        job_content = "".join(json.dumps(request, ensure_ascii=False) + "\n" for request in self.__requests.values())
+        with open(self.__job_filename, "w", encoding="utf-8") as job_file:
+            job_file.write(job_content)
+        job_hash = hashlib.sha256(job_content.encode("utf-8")).hexdigest()
+
+        batch_id = self.__load_batch_id(job_hash)
+        if batch_id is None:
+            batch_id = self.__submit(job_content)
+            with open(self.__state_filename, "w", encoding="utf-8") as state_file:
+                json.dump({"job_hash": job_hash, "batch_id": batch_id}, state_file)
+        else:
+            print(f"Resuming batch {batch_id}")
+
+        batch = self.__wait(batch_id)
+        # A finished batch is never resumed, a re-run submits the requests again
+        os.remove(self.__state_filename)
+        if batch.status in BatchJob.PARTIAL_STATUSES:
+            print(f"Batch {batch_id} {batch.status}, merging the requests done until then")
+
+        self.__merge_results(batch)
+        return dict(self.__answers)
+
+    # A batch id is only reused for the exact same requests
+    def __load_batch_id(self, job_hash):
+        if not os.path.exists(self.__state_filename):
+            return None
+        with open(self.__state_filename, "r", encoding="utf-8") as state_file:
+            state = json.load(state_file)
+        return state["batch_id"] if state.get("job_hash") == job_hash else None
+
+    def __submit(self, job_content):
+        input_file = self.__client.files.create(file=(os.path.basename(self.__job_filename), io.BytesIO(job_content.encode("utf-8"))), purpose="batch")
+        batch = self.__client.batches.create(input_file_id=input_file.id, endpoint=BatchJob.ENDPOINT, completion_window=BatchJob.COMPLETION_WINDOW)
+        print(f"Submitted batch {batch.id} with {len(self.__requests)} requests")
+        return batch.id
+
+    def __wait(self, batch_id):
+        while True:
+            batch = self.__client.batches.retrieve(batch_id)
+            if batch.status in BatchJob.FINAL_STATUSES:
+                return batch
+
+            request_counts = batch.request_counts
+            if request_counts is not None:
+                print(f"Batch {batch_id} {batch.status}: {request_counts.completed}/{request_counts.total} done")
+            time.sleep(self.__poll_interval_seconds)
+
+    def __merge_results(self, batch):
+        if batch.output_file_id is None:
+            return
+
+        response_cache = LLMGateway.get_response_cache()
+        for line in self.__client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            custom_id = result["custom_id"]
+            response = result.get("response") or {}
+            if response.get("status_code") != 200:
+                print(f"Batch request {custom_id} failed: {result.get('error')}")
+                continue
+
+            body = response["body"]
+            answer = body["choices"][0]["message"]["content"].strip()
+            input_tokens = body["usage"]["prompt_tokens"]
+            output_tokens = body["usage"]["completion_tokens"]
+            self.__answers[custom_id] = (answer, input_tokens, output_tokens, False)
+
+            if response_cache is not None and custom_id in self.__cache_keys:
+                response_cache.put(self.__cache_keys[custom_id], self.__requests[custom_id]["body"]["model"], answer, input_tokens, output_tokens)
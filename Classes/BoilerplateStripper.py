@@ -0,0 +1,33 @@
+# Removes the text a site repeats on every page (menus, footers, cookie notices, contact blocks, ...) before a page is
+# counted and shortened. Obvious boilerplate regions are dropped from the DOM text (see ParsedPage.get_content_blocks),
+# then every block already seen on an earlier page of the same site is dropped as well. Pages are stripped as they are
+# loaded, so the first page keeps the shared blocks and the following ones do not pay for them again.
+# One instance per site (startup), not thread-safe.
+class BoilerplateStripper():
+    def __init__(self):
+        self.__seen_blocks = set()
+        self.__saved_tokens = 0
+        self.__stripped_pages = 0
+
+    # Page text without boilerplate and repeated blocks
+    def strip(self, parsed_page):
+        kept_blocks = []
+        for block in parsed_page.get_content_blocks():
+            block_key = block.casefold()
+            if block_key in self.__seen_blocks:
+                continue
+            self.__seen_blocks.add(block_key)
+            kept_blocks.append(block)
+
+        self.__stripped_pages += 1
+        return " ".join(kept_blocks)
+
+    # Input tokens the shortener did not get because of stripping (after the page token limit)
+    def add_saved_tokens(self, saved_tokens):
+        self.__saved_tokens += saved_tokens
+
+    def get_saved_tokens(self):
+        return self.__saved_tokens
+
+    def get_stripped_pages(self):
+        return self.__stripped_pages
@@ -0,0 +1,122 @@
+import time
+import threading
+from Classes.WebScraper import WebScraper
+from Classes.RunMetrics import RunMetrics
+
+# Keeps WebScraper drivers warm across startups. A worker acquires a scraper per startup and releases it afterwards;
+# on release the driver is health checked and only recycled when it has loaded too many pages, uses too much memory,
+# failed too many loads in a row or stopped responding. Recycled drivers have their profile dir deleted and a
+# replacement is launched in the background, so the next acquire does not wait for Chrome to start.
+class BrowserPool():
+    MAX_PAGES_PER_DRIVER = 100
+    MAX_MEMORY_MB = 1500
+    # Without psutil only the page's JS heap is known, which is much smaller than the process tree
+    MAX_JS_HEAP_MB = 300
+    MAX_CONSECUTIVE_ERRORS = 5
+
+    def __init__(self, page_cache=None, http_fetcher=None, browser_profile="full", max_pages=MAX_PAGES_PER_DRIVER, max_memory_mb=MAX_MEMORY_MB, max_js_heap_mb=MAX_JS_HEAP_MB, max_errors=MAX_CONSECUTIVE_ERRORS):
+        self.__page_cache = page_cache
+        self.__http_fetcher = http_fetcher
+        self.__browser_profile = browser_profile
+        self.__max_pages = max_pages
+        self.__max_memory_mb = max_memory_mb
+        self.__max_js_heap_mb = max_js_heap_mb
+        self.__max_errors = max_errors
+
+        self.__lock = threading.Lock()
+        self.__idle_scrapers = []
+        self.__launcher_threads = []
+        self.__closed = False
+        self.__recycle_reasons = {"pages": 0, "memory": 0, "errors": 0, "unresponsive": 0}
+
+    # --- Pool methods ---
+    def acquire(self):
+        with self.__lock:
+            if self.__idle_scrapers:
+                return self.__idle_scrapers.pop()
+        return self.__launch()
+
+    def release(self, web_scraper_obj):
+        web_scraper_obj.reset_redirect_url()
+
+        recycle_reason = self.get_recycle_reason(web_scraper_obj)
+        if recycle_reason is None:
+            with self.__lock:
+                if not self.__closed:
+                    self.__idle_scrapers.append(web_scraper_obj)
+                    return
+            self.__quit(web_scraper_obj)
+            return
+
+        print(f"Recycling the selenium driver ({recycle_reason})")
+        with self.__lock:
+            self.__recycle_reasons[recycle_reason] += 1
+        with RunMetrics.span("driver_recycle"):
+            self.__quit(web_scraper_obj)
+
+        # Warm replacement for the next acquire
+        launcher_thread = threading.Thread(target=self.__launch_idle, daemon=True)
+        with self.__lock:
+            self.__launcher_threads.append(launcher_thread)
+        launcher_thread.start()
+
+    # None while the driver is healthy
+    def get_recycle_reason(self, web_scraper_obj):
+        if web_scraper_obj.get_driver_page_count() >= self.__max_pages:
+            return "pages"
+        if web_scraper_obj.get_driver_error_count() >= self.__max_errors:
+            return "errors"
+        if not web_scraper_obj.is_responsive():
+            return "unresponsive"
+        memory_mb = web_scraper_obj.get_memory_mb()
+        if memory_mb is not None:
+            return "memory" if memory_mb >= self.__max_memory_mb else None
+        js_heap_mb = web_scraper_obj.get_js_heap_mb()
+        if js_heap_mb is not None and js_heap_mb >= self.__max_js_heap_mb:
+            return "memory"
+        return None
+
+    def get_recycle_reasons(self):
+        with self.__lock:
+            return dict(self.__recycle_reasons)
+
+    # --- Driver methods ---
+    def __launch(self):
+        start_time = time.perf_counter()
+        web_scraper_obj = WebScraper(self.__page_cache, self.__http_fetcher, self.__browser_profile)
+        RunMetrics.record_duration("driver_launch", time.perf_counter() - start_time)
+        return web_scraper_obj
+
+    def __launch_idle(self):
+        try:
+            web_scraper_obj = self.__launch()
+        except Exception as e:
+            print(f"Could not launch a spare selenium driver: {e}")
+            return
+
+        with self.__lock:
+            if not self.__closed:
+                self.__idle_scrapers.append(web_scraper_obj)
+                return
+        self.__quit(web_scraper_obj)
+
+    def __quit(self, web_scraper_obj):
+        try:
+            web_scraper_obj.quit_driver()
+        except Exception as e:
+            print(f"Error quitting the selenium driver: {e}")
+        web_scraper_obj.delete_profile_dir()
+
+    # Quits every idle driver, including spares still being launched. Scrapers still acquired are quit on release
+    def close(self):
+        with self.__lock:
+            self.__closed = True
+            launcher_threads = list(self.__launcher_threads)
+        for launcher_thread in launcher_threads:
+            launcher_thread.join()
+
+        with self.__lock:
+            idle_scrapers = self.__idle_scrapers
+            self.__idle_scrapers = []
+        for web_scraper_obj in idle_scrapers:
+            self.__quit(web_scraper_obj)
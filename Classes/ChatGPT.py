@@ -1,62 +1,220 @@
-from pydantic import BaseModel
+import re
+from typing import Literal
+from pydantic import BaseModel, ConfigDict, ValidationError
+from Classes.LLMGateway import LLMGateway
+from Classes.ResponseCache import ResponseCache
 
+# Structured answers. Strict JSON schemas must not allow extra properties, hence extra="forbid"
 class Risk_Classification_Structure(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
     highest_risk_classification: str
     requires_additional_information: str
     what_additional_information: str
 
+class Important_Links_Structure(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    links: list[str]
+
+class AI_Classification_Structure(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    is_ai_company: Literal["Yes", "No"]
+
 class ChatGPT():
-    def __init__(self, model_name, prompt, context, client):
+    # Models that accept a strict json_schema response_format (Structured Outputs), also as dated snapshots.
+    # Others, e.g. chatgpt-4o-latest, are sent the prompt without it and answer plain text
+    STRUCTURED_OUTPUT_MODELS = {"gpt-4o", "gpt-4o-mini", "gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano", "o1", "o3", "o3-mini", "o4-mini", "gpt-5", "gpt-5-mini", "gpt-5-nano"}
+
+    __SNAPSHOT_SUFFIX = re.compile(r"-\d{4}-\d{2}-\d{2}$")
+
+    # With a response_format (one of the structures above) a model supporting it is constrained to answer JSON matching
+    # its schema, the answer can then be parsed with parse_answer
+    def __init__(self, model_name, prompt, context, client=None, refresh_cache=False, response_format=None):
         self.__model_name = model_name
         self.__prompt = prompt
         self.__context = context
-        self.__client = client
+        # Use the shared, pooled client unless a specific one is given
+        self.__client = client if client is not None else LLMGateway.get_openai_client()
+        # When refreshing, a cached answer is ignored and overwritten by the new one
+        self.__refresh_cache = refresh_cache
+        self.__cached = False
+        self.__cached_input_tokens = 0
+        self.__response_format = response_format
         # print(f"ChatGPT class initialized with model {self.__model_name}")
 
     def set_prompt(self, prompt):
         self.__prompt = prompt
-    
+
+    # True if the last answer came from the response cache (no API call was made)
+    def is_cached(self):
+        return self.__cached
+
+    # Prompt tokens of the last answer that the provider served from its prompt cache (billed at the cached input rate)
+    def get_cached_input_tokens(self):
+        return self.__cached_input_tokens
+
+    @staticmethod
+    def supports_structured_output(model_name):
+        return ChatGPT.__SNAPSHOT_SUFFIX.sub("", model_name) in ChatGPT.STRUCTURED_OUTPUT_MODELS
+
+    # True if the answer is constrained to the response_format structure, otherwise it is plain text
+    def uses_structured_output(self):
+        return self.__response_format is not None and ChatGPT.supports_structured_output(self.__model_name)
+
+    # Request parameter for a strict JSON schema answer
+    @staticmethod
+    def make_response_format(structure):
+        return {"type": "json_schema", "json_schema": {"name": structure.__name__, "schema": structure.model_json_schema(), "strict": True}}
+
+    # Extra request parameters for a structured answer from model_name, empty if the model does not support it.
+    # Also used by BatchJob, so batched requests match the synchronous ones
+    @staticmethod
+    def make_structured_params(model_name, structure):
+        if not ChatGPT.supports_structured_output(model_name):
+            return {}
+        return {"response_format": ChatGPT.make_response_format(structure)}
+
+    # The answer as an instance of the response_format structure, None if it does not match the schema (e.g. a refusal)
+    @staticmethod
+    def parse_structured_answer(structure, answer):
+        if answer is None:
+            return None
+        try:
+            return structure.model_validate_json(answer)
+        except ValidationError as e:
+            print(f"Answer does not match {structure.__name__}: {e}")
+            return None
+
+    # None for plain text answers (see uses_structured_output)
+    def parse_answer(self, answer):
+        if not self.uses_structured_output():
+            return None
+        return ChatGPT.parse_structured_answer(self.__response_format, answer)
+
+    # Extra request parameters, part of the cache key
+    def __get_params(self, params):
+        if self.__response_format is not None:
+            params = {**params, **ChatGPT.make_structured_params(self.__model_name, self.__response_format)}
+        return params
+
+    def __set_cached_input_tokens(self, usage):
+        prompt_tokens_details = getattr(usage, "prompt_tokens_details", None)
+        self.__cached_input_tokens = getattr(prompt_tokens_details, "cached_tokens", None) or 0
+
+    # --- Cache methods ---
+    def __cache_lookup(self, params):
+        self.__cached = False
+        self.__cached_input_tokens = 0
+        response_cache = LLMGateway.get_response_cache()
+        if response_cache is None:
+            return None, None
+
+        cache_key = ResponseCache.make_key(self.__model_name, self.__context, params)
+        if self.__refresh_cache:
+            return cache_key, None
+
+        cached_response = response_cache.get(cache_key)
+        if cached_response is not None:
+            self.__cached = True
+            self.__context.append({"role": "assistant", "content": cached_response[0]})
+        return cache_key, cached_response
+
+    # The answer is already paid for, so a failed store (e.g. the cache file locked by another worker) only costs the cache entry
+    def __cache_store(self, cache_key, answer, input_tokens, output_tokens):
+        response_cache = LLMGateway.get_response_cache()
+        if response_cache is None or cache_key is None:
+            return
+        try:
+            response_cache.put(cache_key, self.__model_name, answer, input_tokens, output_tokens)
+        except Exception as e:
+            print(f"Could not cache the answer: {e}")
+
     def chat_model(self):
         self.__context.append({"role": "user", "content": self.__prompt})
 
         try:
-            response = self.__client.chat.completions.create(
+            params = self.__get_params({})
+            cache_key, cached_response = self.__cache_lookup(params)
+            if cached_response is not None:
+                return cached_response
+
+            response = LLMGateway.get_rate_limiter().run(self.__model_name, self.__context, lambda: self.__client.chat.completions.create(
                 model=self.__model_name,
-                messages=self.__context
-            )
+                messages=self.__context,
+                **params
+            ))
 
             answer = response.choices[0].message.content.strip()
             self.__context.append({"role": "assistant", "content": answer})
 
             input_tokens = response.usage.prompt_tokens
             output_tokens = response.usage.completion_tokens
+            self.__set_cached_input_tokens(response.usage)
 
+            self.__cache_store(cache_key, answer, input_tokens, output_tokens)
             return [answer, input_tokens, output_tokens]
-        
+
         except Exception as e:
             print(f"API Error: {e}")
-            return [None, None]
-        
+            return [None, None, None]
+
     def chat_model_reasoning(self):
         self.__context.append({"role": "user", "content": self.__prompt})
 
         try:
-            response = self.__client.chat.completions.create(
+            params = self.__get_params({"reasoning_effort": "high"})
+            cache_key, cached_response = self.__cache_lookup(params)
+            if cached_response is not None:
+                return cached_response
+
+            response = LLMGateway.get_rate_limiter().run(self.__model_name, self.__context, lambda: self.__client.chat.completions.create(
                 model=self.__model_name,
                 messages=self.__context,
-                reasoning_effort="high"
-            )
+                **params
+            ))
 
             answer = response.choices[0].message.content.strip()
             self.__context.append({"role": "assistant", "content": answer})
 
             input_tokens = response.usage.prompt_tokens
             output_tokens = response.usage.completion_tokens
+            self.__set_cached_input_tokens(response.usage)
 
+            self.__cache_store(cache_key, answer, input_tokens, output_tokens)
             return [answer, input_tokens, output_tokens]
-        
+
         except Exception as e:
             print(f"API Error: {e}")
-            return [None, None]
+            return [None, None, None]
+
+    # Async variant of chat_model. Must run on the gateway loop, e.g. LLMGateway.submit(chat_obj.async_chat_model())
+    async def async_chat_model(self):
+        self.__context.append({"role": "user", "content": self.__prompt})
 
+        try:
+            params = self.__get_params({})
+            cache_key, cached_response = self.__cache_lookup(params)
+            if cached_response is not None:
+                return cached_response
 
+            response = await LLMGateway.get_rate_limiter().run_async(self.__model_name, self.__context, lambda: LLMGateway.get_async_openai_client().chat.completions.create(
+                model=self.__model_name,
+                messages=self.__context,
+                **params
+            ))
+
+            answer = response.choices[0].message.content.strip()
+            self.__context.append({"role": "assistant", "content": answer})
+
+            input_tokens = response.usage.prompt_tokens
+            output_tokens = response.usage.completion_tokens
+            self.__set_cached_input_tokens(response.usage)
+
+            self.__cache_store(cache_key, answer, input_tokens, output_tokens)
+            return [answer, input_tokens, output_tokens]
+
+        except Exception as e:
+            print(f"API Error: {e}")
+            return [None, None, None]
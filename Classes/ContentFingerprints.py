@@ -0,0 +1,150 @@
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Simhash fingerprints of the crawled pages and startups of earlier runs, kept on disk so a re-run only pays for what changed.
+# A page whose text is near-identical to the last crawl reuses its shortened content; a startup whose pages are all
+# near-identical reuses its full description and AI verdict. Near-identical means at most max_distance of the 64 bits differ.
+# Results are only reused if the same models and prompt version produced them, a re-run with e.g. another reasoning model
+# asks the LLM again.
+class ContentFingerprints():
+    FINGERPRINT_BITS = 64
+    MAX_DISTANCE = 3
+    SHINGLE_WORDS = 3
+
+    __WORD_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, filename, max_distance=MAX_DISTANCE):
+        self.__max_distance = max_distance
+        self.__lock = threading.Lock()
+        self.__outcomes = {"reused": [], "refreshed": []}
+
+        self.__connection = sqlite3.connect(filename, check_same_thread=False)
+        self.__connection.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                fingerprint TEXT,
+                shortened_content TEXT,
+                content_shortener_model TEXT,
+                prompt_version INTEGER,
+                updated_at REAL
+            )""")
+        self.__connection.execute("""
+            CREATE TABLE IF NOT EXISTS startups (
+                startup_key TEXT PRIMARY KEY,
+                fingerprint TEXT,
+                full_description TEXT,
+                answer TEXT,
+                content_shortener_model TEXT,
+                model_name TEXT,
+                reasoning_model TEXT,
+                prompt_version INTEGER,
+                updated_at REAL
+            )""")
+        # Files of earlier versions lack the model columns, their rows never match and are refreshed
+        self.__add_missing_columns("pages", {"content_shortener_model": "TEXT", "prompt_version": "INTEGER"})
+        self.__add_missing_columns("startups", {"content_shortener_model": "TEXT", "model_name": "TEXT", "reasoning_model": "TEXT", "prompt_version": "INTEGER"})
+        self.__connection.commit()
+
+    def __add_missing_columns(self, table, columns):
+        existing_columns = [row[1] for row in self.__connection.execute(f"PRAGMA table_info({table})")]
+        for column, column_type in columns.items():
+            if column not in existing_columns:
+                self.__connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    # --- Fingerprint methods ---
+    # Simhash over the word shingles of one or more texts, as a hex string. Case, punctuation and whitespace are ignored.
+    # Returns None if there is no text
+    @staticmethod
+    def make_fingerprint(texts):
+        shingle_counts = {}
+        for text in texts:
+            words = ContentFingerprints.__WORD_PATTERN.findall(text.lower())
+            if len(words) < ContentFingerprints.SHINGLE_WORDS:
+                shingles = [" ".join(words)] if words else []
+            else:
+                shingles = [" ".join(words[index:index + ContentFingerprints.SHINGLE_WORDS]) for index in range(len(words) - ContentFingerprints.SHINGLE_WORDS + 1)]
+            for shingle in shingles:
+                shingle_counts[shingle] = shingle_counts.get(shingle, 0) + 1
+        if not shingle_counts:
+            return None
+
+        bit_weights = [0] * ContentFingerprints.FINGERPRINT_BITS
+        for shingle, count in shingle_counts.items():
+            shingle_hash = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=ContentFingerprints.FINGERPRINT_BITS // 8).digest(), "big")
+            for bit in range(ContentFingerprints.FINGERPRINT_BITS):
+                bit_weights[bit] += count if shingle_hash >> bit & 1 else -count
+
+        fingerprint = sum(1 << bit for bit, weight in enumerate(bit_weights) if weight > 0)
+        return f"{fingerprint:0{ContentFingerprints.FINGERPRINT_BITS // 4}x}"
+
+    @staticmethod
+    def get_distance(fingerprint, other_fingerprint):
+        return bin(int(fingerprint, 16) ^ int(other_fingerprint, 16)).count("1")
+
+    def is_near_identical(self, fingerprint, other_fingerprint):
+        if fingerprint is None or other_fingerprint is None:
+            return False
+        return ContentFingerprints.get_distance(fingerprint, other_fingerprint) <= self.__max_distance
+
+    # --- Page methods ---
+    # Shortened content of the last crawl of url if its text is near-identical and it was shortened by the same model
+    # and prompt version, otherwise None
+    def get_page(self, url, fingerprint, content_shortener_model, prompt_version):
+        with self.__lock:
+            row = self.__connection.execute("SELECT fingerprint, shortened_content FROM pages WHERE url = ? AND content_shortener_model = ? AND prompt_version = ?",
+                                            (url, content_shortener_model, prompt_version)).fetchone()
+        if row is None or not self.is_near_identical(fingerprint, row[0]):
+            return None
+        return row[1]
+
+    def put_page(self, url, fingerprint, shortened_content, content_shortener_model, prompt_version):
+        with self.__lock:
+            self.__connection.execute("INSERT OR REPLACE INTO pages (url, fingerprint, shortened_content, content_shortener_model, prompt_version, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                                      (url, fingerprint, shortened_content, content_shortener_model, prompt_version, time.time()))
+            self.__connection.commit()
+
+    # --- Startup methods ---
+    # (full_description, answer) of the last run of the startup if its pages are near-identical and the same models and
+    # prompt version produced them, otherwise None
+    def get_startup(self, startup_key, fingerprint, content_shortener_model, model_name, reasoning_model, prompt_version):
+        with self.__lock:
+            row = self.__connection.execute("SELECT fingerprint, full_description, answer FROM startups WHERE startup_key = ? AND content_shortener_model = ? "
+                                            "AND model_name = ? AND reasoning_model = ? AND prompt_version = ?",
+                                            (startup_key, content_shortener_model, model_name, reasoning_model, prompt_version)).fetchone()
+        if row is None or row[2] is None or not self.is_near_identical(fingerprint, row[0]):
+            return None
+        return row[1], row[2]
+
+    # The answer may follow later (batch mode), see set_startup_answer
+    def put_startup(self, startup_key, fingerprint, full_description, content_shortener_model, model_name, reasoning_model, prompt_version, answer=None):
+        with self.__lock:
+            self.__connection.execute("INSERT OR REPLACE INTO startups (startup_key, fingerprint, full_description, answer, content_shortener_model, model_name, "
+                                      "reasoning_model, prompt_version, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                      (startup_key, fingerprint, full_description, answer, content_shortener_model, model_name, reasoning_model, prompt_version, time.time()))
+            self.__connection.commit()
+
+    def set_startup_answer(self, startup_key, answer):
+        with self.__lock:
+            self.__connection.execute("UPDATE startups SET answer = ?, updated_at = ? WHERE startup_key = ?", (answer, time.time(), startup_key))
+            self.__connection.commit()
+
+    # --- Report methods ---
+    # outcome is "reused" or "refreshed"
+    def record_outcome(self, startup_key, outcome):
+        with self.__lock:
+            self.__outcomes[outcome].append(startup_key)
+
+    def reset_outcomes(self):
+        with self.__lock:
+            self.__outcomes = {outcome: [] for outcome in self.__outcomes}
+
+    def get_report(self):
+        with self.__lock:
+            return {outcome: list(startup_keys) for outcome, startup_keys in self.__outcomes.items()}
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
@@ -0,0 +1,112 @@
+import json
+import threading
+
+# Token cost accounting shared by all workers, independent of the browser.
+# Prices come from a JSON table, in $ per 1M tokens: {"model": {"input": ..., "cached_input": ..., "output": ...}}.
+# cached_input is the rate of prompt tokens served from the provider's prompt cache.
+# Costs are aggregated per startup, per stage (links, shorten, description, ai_check) and for the whole run.
+# Input tokens that were never sent because boilerplate was stripped are counted per startup and for the run.
+class CostLedger():
+    TOKENS_PER_PRICE_UNIT = 1000000
+    BATCH_PRICE_FACTOR = 0.5  # The Batch API bills half of the synchronous price
+
+    def __init__(self, pricing_filename="model_prices.json"):
+        with open(pricing_filename, "r", encoding="utf-8") as pricing_file:
+            self.__prices = json.load(pricing_file)
+        self.__lock = threading.Lock()
+        self.__startups = {}
+        self.__stages = {}
+        self.__run = CostLedger.__new_totals()
+
+    @staticmethod
+    def __new_totals():
+        return {"llm_calls": 0, "cached_calls": 0, "input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0, "cost": 0, "saved_cost": 0, "boilerplate_tokens_saved": 0}
+
+    # Price in $ of one call. Raises ValueError for models missing from the pricing table
+    def get_price(self, model_name, input_tokens, output_tokens, cached_input_tokens=0, batch=False):
+        if model_name not in self.__prices:
+            raise ValueError(f"Model name {model_name} not in the pricing table. Token cost not calculated.")
+
+        prices = self.__prices[model_name]
+        cached_input_tokens = min(cached_input_tokens or 0, input_tokens)
+        price = ((input_tokens - cached_input_tokens) * prices["input"]
+                 + cached_input_tokens * prices.get("cached_input", prices["input"])
+                 + output_tokens * prices["output"]) / CostLedger.TOKENS_PER_PRICE_UNIT
+        return price * CostLedger.BATCH_PRICE_FACTOR if batch else price
+
+    # Book one LLM answer. Answers from the local response cache (cached=True) cost nothing, their price is counted as saved.
+    # Returns the price of the call
+    def record(self, startup_key, stage, model_name, input_tokens, output_tokens, cached_input_tokens=0, cached=False, batch=False):
+        price = self.get_price(model_name, input_tokens, output_tokens, cached_input_tokens, batch)
+
+        with self.__lock:
+            startup_totals = self.__startups.setdefault(startup_key, {"totals": CostLedger.__new_totals(), "stages": {}})
+            for totals in (self.__run, self.__stages.setdefault(stage, CostLedger.__new_totals()), startup_totals["totals"], startup_totals["stages"].setdefault(stage, CostLedger.__new_totals())):
+                totals["llm_calls"] += 1
+                totals["input_tokens"] += input_tokens
+                totals["cached_input_tokens"] += cached_input_tokens or 0
+                totals["output_tokens"] += output_tokens
+                if cached:
+                    totals["cached_calls"] += 1
+                    totals["saved_cost"] += price
+                else:
+                    totals["cost"] += price
+        return price
+
+    def record_boilerplate_tokens(self, startup_key, saved_tokens):
+        with self.__lock:
+            startup_totals = self.__startups.setdefault(startup_key, {"totals": CostLedger.__new_totals(), "stages": {}})
+            for totals in (self.__run, startup_totals["totals"]):
+                totals["boilerplate_tokens_saved"] += saved_tokens
+
+    # Costs booked by an earlier, interrupted run still count towards the startup
+    def restore_startup(self, startup_key, cost, saved_cost):
+        with self.__lock:
+            startup_totals = self.__startups.setdefault(startup_key, {"totals": CostLedger.__new_totals(), "stages": {}})
+            startup_totals["totals"]["cost"] += cost
+            startup_totals["totals"]["saved_cost"] += saved_cost
+
+    def get_startup_totals(self, startup_key):
+        with self.__lock:
+            startup_totals = self.__startups.get(startup_key)
+            return dict(startup_totals["totals"]) if startup_totals is not None else CostLedger.__new_totals()
+
+    def get_startup(self, startup_key):
+        return StartupCosts(self, startup_key)
+
+    def get_stage_totals(self):
+        with self.__lock:
+            return {stage: dict(totals) for stage, totals in self.__stages.items()}
+
+    def get_run_totals(self):
+        with self.__lock:
+            return dict(self.__run)
+
+    def get_report(self):
+        with self.__lock:
+            return json.loads(json.dumps({"run": self.__run, "stages": self.__stages, "startups": self.__startups}))
+
+
+# The ledger as seen by one startup, handed to the pipeline functions instead of the startup key
+class StartupCosts():
+    def __init__(self, cost_ledger, startup_key):
+        self.__cost_ledger = cost_ledger
+        self.__startup_key = startup_key
+
+    def record(self, stage, model_name, input_tokens, output_tokens, cached_input_tokens=0, cached=False, batch=False):
+        return self.__cost_ledger.record(self.__startup_key, stage, model_name, input_tokens, output_tokens, cached_input_tokens, cached, batch)
+
+    def record_boilerplate_tokens(self, saved_tokens):
+        self.__cost_ledger.record_boilerplate_tokens(self.__startup_key, saved_tokens)
+
+    def restore(self, cost, saved_cost):
+        self.__cost_ledger.restore_startup(self.__startup_key, cost, saved_cost)
+
+    def get_token_cost(self):
+        return self.__cost_ledger.get_startup_totals(self.__startup_key)["cost"]
+
+    def get_saved_token_cost(self):
+        return self.__cost_ledger.get_startup_totals(self.__startup_key)["saved_cost"]
+
+    def get_llm_calls(self):
+        return self.__cost_ledger.get_startup_totals(self.__startup_key)["llm_calls"]
@@ -0,0 +1,79 @@
+import threading
+import httpx
+from Classes.ParsedPage import ParsedPage
+
+# Fast fetch tier: a pooled plain HTTP GET, shared by all workers.
+# Pages that look like a JavaScript-rendered shell are rejected so the caller can fall back to Selenium.
+class HttpFetcher():
+    USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    MIN_TEXT_CHARS = 500  # Less visible text than this is treated as an unrendered shell
+    MAX_SCRIPT_TO_TEXT_RATIO = 20  # Inline script size compared to visible text
+    JS_SHELL_MARKERS = ['<div id="root"></div>', '<div id="app"></div>', '<div id="__next"></div>', "enable javascript", "javascript is required", "javascript is disabled", "requires javascript"]
+
+    def __init__(self, timeout=10):
+        self.__client = httpx.Client(
+            follow_redirects=True,
+            timeout=timeout,
+            verify=False,  # Same as --ignore-certificate-errors in the browser
+            headers={"User-Agent": HttpFetcher.USER_AGENT, "Accept": "text/html,application/xhtml+xml", "Accept-Language": "en-US,en;q=0.9,de;q=0.8"},
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+        self.__tier_stats = {"cache": 0, "http": 0, "selenium": 0, "failed": 0}
+        self.__stats_lock = threading.Lock()
+
+    # Returns (final_url, parsed_page) for a usable static page, otherwise (None, None)
+    def fetch(self, url):
+        try:
+            response = self.__client.get(url)
+        except httpx.HTTPError as e:
+            print(f"HTTP fetch failed for {url}: {e.__class__.__name__}")
+            return None, None
+
+        if response.status_code != 200 or "html" not in response.headers.get("content-type", ""):
+            return None, None
+
+        # The parse done for the heuristics is handed on, so the page is not parsed again for extraction
+        parsed_page = ParsedPage(response.text, "")
+        if self.is_js_shell(parsed_page):
+            print(f"JavaScript rendered page, falling back to the browser: {url}")
+            return None, None
+
+        return str(response.url), parsed_page
+
+    def is_js_shell(self, parsed_page):
+        lowered_html = parsed_page.get_body_html().lower()
+        script_chars = parsed_page.get_script_length()
+        text_chars = parsed_page.get_visible_text_length()
+
+        if text_chars < HttpFetcher.MIN_TEXT_CHARS:
+            return True
+        if script_chars > text_chars * HttpFetcher.MAX_SCRIPT_TO_TEXT_RATIO:
+            return True
+        # Markers only count on thin pages, real content pages often mention JavaScript somewhere
+        if text_chars < HttpFetcher.MIN_TEXT_CHARS * 4 and any(marker in lowered_html for marker in HttpFetcher.JS_SHELL_MARKERS):
+            return True
+        return False
+
+    # --- Tier stats methods ---
+    # Counts which tier (cache, http, selenium) served each page load, across all workers
+    def record_tier(self, tier):
+        with self.__stats_lock:
+            self.__tier_stats[tier] += 1
+
+    def get_tier_stats(self):
+        with self.__stats_lock:
+            return dict(self.__tier_stats)
+
+    def reset_tier_stats(self):
+        with self.__stats_lock:
+            self.__tier_stats = {tier: 0 for tier in self.__tier_stats}
+
+    def get_tier_hit_rates(self):
+        tier_stats = self.get_tier_stats()
+        total_loads = sum(tier_stats.values())
+        if total_loads == 0:
+            return {tier: 0.0 for tier in tier_stats}
+        return {tier: count / total_loads for tier, count in tier_stats.items()}
+
+    def close(self):
+        self.__client.close()
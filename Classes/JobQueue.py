@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import uuid
+import redis
+
+# Redis-backed queue between the web UI and the pipeline workers. The web tier only enqueues uploads, streams progress
+# and serves finished results; separate worker processes (worker.py) run the jobs.
+# Every job has a status hash, its input file, a log list (so a late or reconnecting SSE client gets the full history)
+# and, once done, its result file and run report, all expiring after JOB_TTL_SECONDS. Log lines are also published on a per-job channel.
+# A job being processed sits in the processing list; if its worker stops sending heartbeats it is put back in the queue.
+class JobQueue():
+    KEY_PREFIX = "pnp"
+    JOB_TTL_SECONDS = 7 * 24 * 3600
+    HEARTBEAT_TTL_SECONDS = 90
+    DEQUEUE_POLL_SECONDS = 0.5
+    FINAL_STATUSES = ["completed", "failed"]
+    # The web UI enables the download button on this message
+    COMPLETE_MESSAGE = "Processing complete!"
+    # Moves the next job to the processing list and sets its heartbeat and status in one step, so requeue_stalled of
+    # another worker never sees a dequeued job without a heartbeat. ARGV: job key prefix, now, heartbeat TTL
+    DEQUEUE_SCRIPT = """
+        local job_id = redis.call("LMOVE", KEYS[1], KEYS[2], "RIGHT", "LEFT")
+        if not job_id then
+            return false
+        end
+        local job_key = ARGV[1] .. job_id
+        redis.call("SET", job_key .. ":heartbeat", ARGV[2], "EX", ARGV[3])
+        redis.call("HSET", job_key, "status", "running", "started_at", ARGV[2])
+        return job_id
+    """
+
+    def __init__(self, redis_client):
+        self.__redis = redis_client
+        self.__queued_key = f"{JobQueue.KEY_PREFIX}:jobs:queued"
+        self.__processing_key = f"{JobQueue.KEY_PREFIX}:jobs:processing"
+        self.__dequeue_script = self.__redis.register_script(JobQueue.DEQUEUE_SCRIPT)
+
+    # Connection settings of the docker-compose redis service, overridable through REDIS_HOST / REDIS_PORT / REDIS_PASSWORD
+    @classmethod
+    def from_env(cls):
+        return cls(redis.Redis(host=os.getenv("REDIS_HOST", "redis"), port=int(os.getenv("REDIS_PORT", "6379")), password=os.getenv("REDIS_PASSWORD")))
+
+    def __job_key(self, job_id, suffix=None):
+        return f"{JobQueue.KEY_PREFIX}:job:{job_id}" + (f":{suffix}" if suffix else "")
+
+    # --- Web tier methods ---
+    # Store the uploaded input and queue the job, returns its id
+    def enqueue(self, input_filename, input_bytes):
+        job_id = uuid.uuid4().hex
+        pipeline = self.__redis.pipeline()
+        pipeline.hset(self.__job_key(job_id), mapping={"status": "queued", "input_filename": input_filename, "created_at": time.time()})
+        pipeline.expire(self.__job_key(job_id), JobQueue.JOB_TTL_SECONDS)
+        pipeline.set(self.__job_key(job_id, "input"), input_bytes, ex=JobQueue.JOB_TTL_SECONDS)
+        pipeline.lpush(self.__queued_key, job_id)
+        pipeline.execute()
+        self.publish(job_id, "Files uploaded, waiting for a worker")
+        return job_id
+
+    # {status, input_filename, created_at, ...} or None for unknown (or expired) jobs
+    def get_status(self, job_id):
+        job = self.__redis.hgetall(self.__job_key(job_id))
+        return {key.decode("utf-8"): value.decode("utf-8") for key, value in job.items()} or None
+
+    # (filename, content) of a completed job, otherwise None
+    def get_result(self, job_id):
+        job = self.get_status(job_id)
+        if job is None or job["status"] != "completed":
+            return None
+        result_bytes = self.__redis.get(self.__job_key(job_id, "result"))
+        return (job["result_filename"], result_bytes) if result_bytes is not None else None
+
+    # Run report (JSON) of a completed job, otherwise None
+    def get_report(self, job_id):
+        job = self.get_status(job_id)
+        if job is None or job["status"] != "completed":
+            return None
+        return self.__redis.get(self.__job_key(job_id, "report"))
+
+    # Log lines of the job, the earlier ones first, then new ones as they are published, until the job is completed or failed.
+    # Yields None every keep_alive_seconds without a new line, so the caller can keep the connection open
+    def iter_events(self, job_id, keep_alive_seconds=15):
+        pubsub = self.__redis.pubsub(ignore_subscribe_messages=True)
+        # Subscribe before reading the history, lines published in between arrive twice and are skipped by index
+        pubsub.subscribe(self.__job_key(job_id, "events"))
+        try:
+            next_index = 0
+            while True:
+                for message in self.__redis.lrange(self.__job_key(job_id, "log"), next_index, -1):
+                    next_index += 1
+                    yield message.decode("utf-8")
+
+                job = self.get_status(job_id)
+                if job is None or job["status"] in JobQueue.FINAL_STATUSES:
+                    # Lines published after the last read
+                    for message in self.__redis.lrange(self.__job_key(job_id, "log"), next_index, -1):
+                        yield message.decode("utf-8")
+                    return
+
+                event = pubsub.get_message(timeout=keep_alive_seconds)
+                if event is None:
+                    yield None
+                    continue
+                event = json.loads(event["data"])
+                if event["index"] == next_index:
+                    next_index += 1
+                    yield event["message"]
+                # Otherwise the line was already read from the log, or lines were missed and are read from the log next
+        finally:
+            pubsub.close()
+
+    # --- Worker methods ---
+    # Wait up to timeout_seconds for the next job, returns its id or None.
+    # Polls instead of BLMOVE, a blocking move cannot set the heartbeat in the same step
+    def dequeue(self, timeout_seconds=5):
+        deadline = time.monotonic() + timeout_seconds
+        while True:
+            job_id = self.__dequeue_script(keys=[self.__queued_key, self.__processing_key],
+                                           args=[self.__job_key(""), time.time(), JobQueue.HEARTBEAT_TTL_SECONDS])
+            if job_id is not None:
+                return job_id.decode("utf-8")
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(JobQueue.DEQUEUE_POLL_SECONDS)
+
+    # (filename, content) of the uploaded input
+    def get_input(self, job_id):
+        return self.get_status(job_id)["input_filename"], self.__redis.get(self.__job_key(job_id, "input"))
+
+    # Must be called more often than HEARTBEAT_TTL_SECONDS while the job runs
+    def heartbeat(self, job_id):
+        self.__redis.set(self.__job_key(job_id, "heartbeat"), time.time(), ex=JobQueue.HEARTBEAT_TTL_SECONDS)
+
+    # Append a line to the job log and notify the subscribed SSE streams
+    def publish(self, job_id, message):
+        self.__append_log(job_id, message, {})
+
+    # The last log line is pushed before the final status is set, in one transaction. iter_events stops at the final
+    # status, so it must never see it without the line
+    def __append_log(self, job_id, message, job_fields):
+        pipeline = self.__redis.pipeline()
+        pipeline.rpush(self.__job_key(job_id, "log"), message)
+        pipeline.expire(self.__job_key(job_id, "log"), JobQueue.JOB_TTL_SECONDS)
+        if job_fields:
+            pipeline.hset(self.__job_key(job_id), mapping=job_fields)
+        index = pipeline.execute()[0] - 1
+        self.__redis.publish(self.__job_key(job_id, "events"), json.dumps({"index": index, "message": message}))
+
+    def complete(self, job_id, result_filename, result_bytes, report_bytes=None):
+        pipeline = self.__redis.pipeline()
+        pipeline.set(self.__job_key(job_id, "result"), result_bytes, ex=JobQueue.JOB_TTL_SECONDS)
+        if report_bytes is not None:
+            pipeline.set(self.__job_key(job_id, "report"), report_bytes, ex=JobQueue.JOB_TTL_SECONDS)
+        pipeline.execute()
+        self.__append_log(job_id, JobQueue.COMPLETE_MESSAGE, {"status": "completed", "result_filename": result_filename, "finished_at": time.time()})
+        self.__finish(job_id)
+
+    def fail(self, job_id, error):
+        self.__append_log(job_id, f"Processing failed: {error}", {"status": "failed", "error": error, "finished_at": time.time()})
+        self.__finish(job_id)
+
+    def __finish(self, job_id):
+        self.__redis.lrem(self.__processing_key, 0, job_id)
+        self.__redis.delete(self.__job_key(job_id, "heartbeat"), self.__job_key(job_id, "input"))
+
+    # Put jobs of workers that stopped (no heartbeat) back at the front of the queue, returns their ids
+    def requeue_stalled(self):
+        requeued_job_ids = []
+        for job_id in self.__redis.lrange(self.__processing_key, 0, -1):
+            job_id = job_id.decode("utf-8")
+            if self.__redis.exists(self.__job_key(job_id, "heartbeat")):
+                continue
+            # Only the worker that removes it from the processing list requeues it
+            if self.__redis.lrem(self.__processing_key, 0, job_id):
+                self.__redis.rpush(self.__queued_key, job_id)
+                self.__redis.hset(self.__job_key(job_id), "status", "queued")
+                self.publish(job_id, "Worker stopped, the job was queued again")
+                requeued_job_ids.append(job_id)
+        return requeued_job_ids
@@ -0,0 +1,98 @@
+import os
+import asyncio
+import threading
+from openai import OpenAI, AsyncOpenAI
+import anthropic
+from Classes.RateLimiter import RateLimiter
+
+# Process-wide LLM clients. Every ChatGPT object shares the same connection pools instead of opening a new one per request.
+# The endpoints can be pointed at a local mock server through OPENAI_BASE_URL / ANTHROPIC_BASE_URL.
+# OpenAI calls are retried by the shared RateLimiter instead of the SDK, so backoff is coordinated across workers.
+class LLMGateway():
+    MAX_RETRIES = 5
+
+    __lock = threading.Lock()
+    __openai_client = None
+    __openai_batch_client = None
+    __async_openai_client = None
+    __anthropic_client = None
+    __event_loop = None
+    __response_cache = None
+    __rate_limiter = None
+
+    # --- Client methods ---
+    @classmethod
+    def get_openai_client(cls):
+        with cls.__lock:
+            if cls.__openai_client is None:
+                cls.__openai_client = OpenAI(api_key=os.getenv("MY_KEY"), max_retries=0)
+            return cls.__openai_client
+
+    # For the files and batches endpoints (BatchJob), which do not go through the RateLimiter, so the SDK retries them
+    @classmethod
+    def get_openai_batch_client(cls):
+        with cls.__lock:
+            if cls.__openai_batch_client is None:
+                cls.__openai_batch_client = OpenAI(api_key=os.getenv("MY_KEY"), max_retries=cls.MAX_RETRIES)
+            return cls.__openai_batch_client
+
+    # The async client is bound to the gateway event loop, so it must only be awaited there (see submit)
+    @classmethod
+    def get_async_openai_client(cls):
+        with cls.__lock:
+            if cls.__async_openai_client is None:
+                cls.__async_openai_client = AsyncOpenAI(api_key=os.getenv("MY_KEY"), max_retries=0)
+            return cls.__async_openai_client
+
+    @classmethod
+    def get_anthropic_client(cls):
+        with cls.__lock:
+            if cls.__anthropic_client is None:
+                cls.__anthropic_client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_KEY"), max_retries=cls.MAX_RETRIES)
+            return cls.__anthropic_client
+
+    # --- Response cache methods ---
+    # Optional ResponseCache consulted by ChatGPT before every API call
+    @classmethod
+    def set_response_cache(cls, response_cache):
+        cls.__response_cache = response_cache
+
+    @classmethod
+    def get_response_cache(cls):
+        return cls.__response_cache
+
+    # --- Rate limiter methods ---
+    # Scheduler every ChatGPT call goes through, a default one (without configured limits) is created on first use
+    @classmethod
+    def set_rate_limiter(cls, rate_limiter):
+        cls.__rate_limiter = rate_limiter
+
+    @classmethod
+    def get_rate_limiter(cls):
+        with cls.__lock:
+            if cls.__rate_limiter is None:
+                cls.__rate_limiter = RateLimiter()
+            return cls.__rate_limiter
+
+    # --- Event loop methods ---
+    # A single background loop keeps the async connection pool alive across calls from any thread
+    @classmethod
+    def get_event_loop(cls):
+        with cls.__lock:
+            if cls.__event_loop is None:
+                cls.__event_loop = asyncio.new_event_loop()
+                threading.Thread(target=cls.__event_loop.run_forever, name="llm-gateway-loop", daemon=True).start()
+            return cls.__event_loop
+
+    # Schedule a coroutine on the gateway loop and return a concurrent.futures.Future for it
+    @classmethod
+    def submit(cls, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, cls.get_event_loop())
+
+    # Send all prompts of a batch of ChatGPT objects together and wait for every answer, in input order
+    @classmethod
+    def chat_batch(cls, chat_objs):
+        async def gather_answers():
+            return await asyncio.gather(*(chat_obj.async_chat_model() for chat_obj in chat_objs))
+
+        return cls.submit(gather_answers()).result()
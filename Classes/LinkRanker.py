@@ -0,0 +1,86 @@
+import re
+from urllib.parse import urlparse, urljoin, unquote
+from Classes.LinkWorker import LinkWorker
+
+# Local, rule-based choice of the homepage links worth crawling, instead of asking the LLM.
+# URL path segments and anchor text are scored against product/technology/solution keywords (English and German),
+# legal, career, blog, login and contact pages are pushed out, and shallow pages are preferred over deep ones.
+class LinkRanker():
+    # Keywords of 5+ characters also match as a prefix, e.g. "product" matches "products" and "produkt" matches "produkte"
+    POSITIVE_KEYWORDS = {
+        "product": 3, "produkt": 3, "solution": 3, "losung": 3, "loesung": 3, "lösung": 3,
+        "technology": 3, "technologie": 3, "platform": 3, "plattform": 3, "software": 2,
+        "ai": 3, "ki": 3, "artificial intelligence": 3, "künstliche intelligenz": 3, "kuenstliche intelligenz": 3,
+        "machine learning": 3, "deep learning": 3, "computer vision": 3, "nlp": 3, "algorithm": 2, "algorithmus": 2,
+        "feature": 2, "funktion": 2, "how it works": 3, "so funktioniert": 3, "use case": 2, "anwendung": 2,
+        "service": 2, "leistung": 2, "dienstleistung": 2, "angebot": 2, "offering": 2, "what we do": 3, "was wir": 2,
+        "industries": 2, "industry": 2, "branche": 2, "research": 1, "forschung": 1, "innovation": 1,
+        "customer": 1, "kunden": 1, "case stud": 1, "referenz": 1, "integration": 1, "api": 1, "pricing": 1, "preise": 1,
+    }
+    NEGATIVE_KEYWORDS = {
+        "impressum": -6, "imprint": -6, "datenschutz": -6, "privacy": -6, "terms": -6, "agb": -6, "legal": -6,
+        "cookie": -6, "disclaimer": -6, "nutzungsbedingungen": -6, "rechtliche": -6, "gdpr": -6, "dsgvo": -6,
+        "career": -5, "karriere": -5, "jobs": -5, "job": -5, "stellenangebot": -5, "vacanc": -5, "hiring": -5,
+        "blog": -4, "news": -4, "press": -4, "presse": -4, "aktuelles": -4, "events": -4, "event": -4, "webinar": -4, "podcast": -4,
+        "login": -5, "signin": -5, "sign in": -5, "anmelden": -5, "signup": -5, "sign up": -5, "register": -5, "registrieren": -5,
+        "account": -4, "konto": -4, "support": -3, "help": -3, "hilfe": -3, "faq": -3,
+        "contact": -3, "kontakt": -3, "team": -3, "about": -2, "über uns": -2, "ueber uns": -2, "uber uns": -2,
+    }
+    # Downloads and media are never worth a page load
+    SKIPPED_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".zip", ".mp4", ".mp3", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx")
+    DEPTH_PENALTY = 0.5  # Per path segment after the first
+    NEUTRAL_MIN_SCORE = -2  # With include_neutral, links down to this score are kept (no keyword hit, a few levels deep)
+    MIN_PREFIX_LENGTH = 5
+
+    # Keywords are matched on whole words of the path and anchor text joined with spaces
+    __WORD_SPLIT = re.compile(r"[^a-z0-9äöüß]+")
+
+    def __normalize(self, text):
+        return " ".join(word for word in LinkRanker.__WORD_SPLIT.split(unquote(text).lower()) if word)
+
+    def __keyword_score(self, text, keywords):
+        words = text.split(" ")
+        score = 0
+        for keyword, weight in keywords.items():
+            if " " in keyword:
+                matched = f" {keyword}" in f" {text}"
+            elif len(keyword) >= LinkRanker.MIN_PREFIX_LENGTH:
+                matched = any(word.startswith(keyword) for word in words)
+            else:
+                matched = keyword in words
+            if matched:
+                score += weight
+        return score
+
+    # Score of one link, anchor text counts as much as the URL path
+    def score(self, url, anchor_text=""):
+        path = urlparse(url).path
+        if path.lower().endswith(LinkRanker.SKIPPED_EXTENSIONS):
+            return float("-inf")
+
+        path_text = self.__normalize(path)
+        anchor_text = self.__normalize(anchor_text)
+        score = 0
+        for text in (path_text, anchor_text):
+            score += self.__keyword_score(text, LinkRanker.POSITIVE_KEYWORDS)
+            score += self.__keyword_score(text, LinkRanker.NEGATIVE_KEYWORDS)
+
+        depth = len([segment for segment in path.split("/") if segment])
+        return score - LinkRanker.DEPTH_PENALTY * max(depth - 1, 0)
+
+    # Anchor texts of every link on the page, keyed by the cleaned absolute URL (as produced by LinkWorker.filter_page_links)
+    def get_anchor_texts(self, source_url, anchors):
+        anchor_texts = {}
+        for href, anchor_text in anchors:
+            url = LinkWorker.clean_url(urljoin(source_url, href))
+            anchor_texts[url] = f"{anchor_texts.get(url, '')} {anchor_text}".strip()
+        return anchor_texts
+
+    # Best links first, at most limit of them. Only links with a positive score are kept, unless include_neutral is set
+    # (then links that are merely not penalized follow them, e.g. as candidates for the LLM). Ties keep the page order
+    def rank(self, source_url, links, anchors, limit, include_neutral=False):
+        anchor_texts = self.get_anchor_texts(source_url, anchors)
+        scored_links = [(self.score(link, anchor_texts.get(link, "")), index, link) for index, link in enumerate(links)]
+        min_score = LinkRanker.NEUTRAL_MIN_SCORE if include_neutral else 1e-9
+        ranked_links = sorted((scored_link for scored_link in scored_links if scored_link[0] >= min_score), key=lambda scored_link: (-scored_link[0], scored_link[1]))
+        return [link for _, _, link in ranked_links[:limit]]
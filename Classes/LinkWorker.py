@@ -1,4 +1,6 @@
 from Classes.Selenium import Selenium
+from Classes.ParsedPage import ParsedPage, HTML_PARSER
+from Classes.RunMetrics import RunMetrics
 from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, WebDriverException
 from selenium.webdriver.common.by import By
 from bs4 import BeautifulSoup
@@ -6,22 +8,51 @@ from urllib.parse import urlparse, urlunparse, urljoin
 import time
 import re
 import tiktoken
+from functools import lru_cache
 from openpyxl.utils.escape import escape
 
 
+COOKIE_BUTTON_LABELS = ["Accept", "Accept All", "Allow All", "Agree", "Got it", "Continue", "OK", "I Accept", "I Agree", "Allow", "Accept Cookies", "Yes, I Agree", "Akzeptieren", "Einverstanden", "Zustimmen", "Fortfahren", "Ablehnen", "Alle auswählen", "auswählen", "Alle akzeptieren", "Alles akzeptieren", "Alle ablehnen", "Zustimmen und weiter", "Alle zulassen"]
+# Lowercased once, compared against lowercased element text
+COOKIE_BUTTON_LABELS_LOWER = frozenset(label.lower() for label in COOKIE_BUTTON_LABELS)
+
+# Accept buttons of common consent management platforms (OneTrust, Cookiebot, Didomi, Quantcast, TrustArc, CookieYes, Borlabs, Complianz, Osano, Klaro, Cookie Notice)
+COOKIE_CMP_SELECTORS = ["#onetrust-accept-btn-handler", "#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll", "#CybotCookiebotDialogBodyButtonAccept", "#didomi-notice-agree-button", ".qc-cmp2-summary-buttons button[mode='primary']", "#truste-consent-button", ".cky-btn-accept", "a._brlbs-btn-accept-all", ".cmplz-btn.cmplz-accept", ".osano-cm-accept-all", ".klaro .cm-btn-accept-all", "#cn-accept-cookie"]
+# CMPs that render inside a shadow root: (host selector, button selector)
+COOKIE_SHADOW_CMP_SELECTORS = [["#usercentrics-root", "[data-testid='uc-accept-all-button']"], ["#usercentrics-cmp-ui", "#accept"]]
+
+
+# One encoder per model for the whole process, tiktoken.encoding_for_model is slow to call per page
+@lru_cache(maxsize=None)
+def get_encoding(model_name):
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        # Unknown to tiktoken (e.g. non-OpenAI models), the GPT-4o encoding is a close estimate
+        return tiktoken.get_encoding("o200k_base")
+
+
 class LinkWorker(Selenium):
     MAX_TIME_SECONDS = 10
+    DEFAULT_PAGE_TOKEN_LIMIT = 8000
+    # Per-model overrides of the page token limit, e.g. {"gpt-4o-mini": 16000}
+    PAGE_TOKEN_LIMITS = {}
 
-    def __init__(self):
-        self.__driver = super().__init__()
+    def __init__(self, browser_profile="full"):
+        self.__driver = super().__init__(browser_profile)
         self.__body_html = ""
+        self.__iframe_text = ""
+        # Parsed form of the current body_html/iframe_text, built on first use
+        self.__parsed_page = None
         
         # Rebuild the URL (keep path as-is, drop query and fragment)
         # self.__url = self.clean_url(url)
 
         return self.__driver
 
-    def clean_url(self, url):
+    # Static so URLs can be normalized without a browser (e.g. for grouping input rows by domain)
+    @staticmethod
+    def clean_url(url):
         # set the right protocol
         if not url.startswith(("http://", "https://")):
             url = f"https://{url}"
@@ -35,7 +66,8 @@ class LinkWorker(Selenium):
         return cleaned_url
 
 
-    def toggle_www(self, url):
+    @staticmethod
+    def toggle_www(url):
         if "www." in url:
             return url.replace("www.", "", 1)  # Remove 'www.' only once
         else:
@@ -55,43 +87,134 @@ class LinkWorker(Selenium):
             # print(f"Unexpected error on XPath {xpath}. Reason: {e}. Function: find_elements_by_xpath")
             return []
 
-    def page_scroller(self):
-        start_time = time.time()
+    # Runs inside the page: scrolls one viewport per step until the bottom is reached and neither the DOM
+    # nor the scroll height has changed for settle_ms. Pages without lazy-load content are not scrolled at all.
+    SCROLL_SCRIPT = """
+        const [maxTimeMs, settleMs, stepDelayMs, done] = arguments;
+        const start = performance.now();
+        const scrollHeight = () => Math.max(document.body ? document.body.scrollHeight : 0, document.documentElement.scrollHeight);
+        const lazySelector = 'img[loading="lazy"], iframe[loading="lazy"], [data-src], [data-srcset], [data-lazy], [data-lazy-src], .lazy, .lazyload, [data-infinite-scroll]';
 
-        try:
-            while True:
-                # Scroll by viewport height
-                self.__driver.execute_script("window.scrollBy(0, window.innerHeight);")
-                time.sleep(0.5)
+        if (!document.querySelector(lazySelector)) {
+            done({skipped: true, steps: 0});
+            return;
+        }
+
+        let steps = 0;
+        let lastHeight = scrollHeight();
+        let lastChange = start;
+        const observer = new MutationObserver(() => { lastChange = performance.now(); });
+        observer.observe(document.documentElement, {childList: true, subtree: true});
 
-                # Calculate how far we have scrolled and how much is remaining
-                scrolled_height = self.__driver.execute_script("return Math.round(window.pageYOffset);")
-                total_scrollable_height = self.__driver.execute_script("return Math.round(document.body.scrollHeight);")
-                visible_height = self.__driver.execute_script("return Math.round(window.innerHeight);")
+        const step = () => {
+            const now = performance.now();
+            const height = scrollHeight();
+            if (height !== lastHeight) {
+                lastHeight = height;
+                lastChange = now;
+            }
 
-                elapsed_time = time.time() - start_time
+            const atBottom = Math.round(window.pageYOffset) + window.innerHeight >= height - 5;
+            if ((atBottom && now - lastChange >= settleMs) || now - start > maxTimeMs) {
+                observer.disconnect();
+                done({skipped: false, steps: steps});
+                return;
+            }
 
-                # Break conditions: 1) We have reached the end of the page 2) Elapsed time is greater than the maximum allowed time
-                if (scrolled_height + visible_height >= total_scrollable_height - 5) or (elapsed_time > LinkWorker.MAX_TIME_SECONDS):
-                    break
+            if (!atBottom) {
+                window.scrollBy(0, window.innerHeight);
+                steps += 1;
+            }
+            setTimeout(step, stepDelayMs);
+        };
+        step();
+    """
+    SCROLL_SETTLE_SECONDS = 0.5
+    SCROLL_STEP_DELAY_SECONDS = 0.1
 
+    def page_scroller(self):
+        start_time = time.time()
+
+        try:
+            self.__driver.set_script_timeout(LinkWorker.MAX_TIME_SECONDS + 5)
+            self.__driver.execute_async_script(LinkWorker.SCROLL_SCRIPT, LinkWorker.MAX_TIME_SECONDS * 1000, LinkWorker.SCROLL_SETTLE_SECONDS * 1000, LinkWorker.SCROLL_STEP_DELAY_SECONDS * 1000)
         except Exception as e:
             print(f"An error occurred while scrolling")
 
+        # Keep the time spent per page so scroll cost can be measured
+        RunMetrics.record_duration("scroll", time.time() - start_time)
+
     
+    # Runs inside the page: tries the known CMP buttons first, then every visible button and link whose text is a cookie label.
+    # Returns a description of what was clicked, or null.
+    COOKIE_SCRIPT = """
+        const [labels, cmpSelectors, shadowCmpSelectors] = arguments;
+        const labelSet = new Set(labels);
+        const isVisible = (element) => element.getClientRects().length > 0;
+
+        for (const selector of cmpSelectors) {
+            const element = document.querySelector(selector);
+            if (element && isVisible(element)) {
+                element.click();
+                return "CMP: " + selector;
+            }
+        }
+
+        for (const [hostSelector, selector] of shadowCmpSelectors) {
+            const host = document.querySelector(hostSelector);
+            const element = host && host.shadowRoot ? host.shadowRoot.querySelector(selector) : null;
+            if (element) {
+                element.click();
+                return "CMP: " + hostSelector + " " + selector;
+            }
+        }
+
+        const candidates = [...document.querySelectorAll("button"), ...document.querySelectorAll("a")];
+        for (const element of candidates) {
+            if (!isVisible(element)) {
+                continue;
+            }
+            const text = (element.innerText || "").trim();
+            if (labelSet.has(text.toLowerCase())) {
+                element.click();
+                return "Label: " + text;
+            }
+        }
+        return null;
+    """
+
+    # Returns what was clicked, or False if no cookie banner button was found
     def cookie_acceptor(self):
-        cookie_button_labels = ["Accept", "Accept All", "Allow All", "Agree", "Got it", "Continue", "OK", "I Accept", "I Agree", "Allow", "Accept Cookies", "Yes, I Agree", "Akzeptieren", "Einverstanden", "Zustimmen", "Fortfahren", "Ablehnen", "Alle auswählen", "auswählen", "Alle akzeptieren", "Alles akzeptieren", "Alle ablehnen", "Zustimmen und weiter", "Alle zulassen"]
+        with RunMetrics.span("cookie"):
+            return self.__cookie_acceptor()
+
+    def __cookie_acceptor(self):
+        try:
+            clicked = self.__driver.execute_script(LinkWorker.COOKIE_SCRIPT, sorted(COOKIE_BUTTON_LABELS_LOWER), COOKIE_CMP_SELECTORS, COOKIE_SHADOW_CMP_SELECTORS)
+        except Exception as e:
+            # Fall back to matching the elements one by one from Python
+            return self.cookie_acceptor_fallback()
 
+        if clicked:
+            # print(f"Cookie acceptor found and clicked: {clicked}")
+            time.sleep(1)
+            return clicked
+        
+        # print("Cookie acceptor not found")
+        return False
+
+    # Previous implementation, one WebDriver round-trip per element
+    def cookie_acceptor_fallback(self):
         potential_cookie_elems = self.find_elements_by_xpath("//button") + self.find_elements_by_xpath("//a")
         for element in potential_cookie_elems:
             try:
                 potential_cookie_word = element.text.strip()
                 # Compare only in lowercase
-                if potential_cookie_word.lower() in [x.lower() for x in cookie_button_labels]:
+                if potential_cookie_word.lower() in COOKIE_BUTTON_LABELS_LOWER:
                     element.click()
                     # print(f"Cookie acceptor found and clicked: {potential_cookie_word}")
                     time.sleep(1)
-                    return True
+                    return f"Label: {potential_cookie_word}"
             except StaleElementReferenceException:
                 # print("StaleElementReferenceException encountered. Retrying...")
                 continue  # Retry by checking the next element
@@ -105,10 +228,28 @@ class LinkWorker(Selenium):
         # print("Cookie acceptor not found")
         return False
 
-    def count_tokens(self, text, model_name):
-        encoding = tiktoken.encoding_for_model(model_name)
-        tokens = encoding.encode(text)
+    # Static so they can be used (and benchmarked) without a browser
+    @staticmethod
+    def count_tokens(text, model_name):
+        encoding = get_encoding(model_name)
+        tokens = encoding.encode(text, disallowed_special=())
         return len(tokens)
+
+    @staticmethod
+    def get_page_token_limit(model_name):
+        return LinkWorker.PAGE_TOKEN_LIMITS.get(model_name, LinkWorker.DEFAULT_PAGE_TOKEN_LIMIT)
+
+    # Encode once and cut at exactly token_limit tokens. Returns (text, token count of the text before truncation)
+    @staticmethod
+    def truncate_to_tokens(text, model_name, token_limit):
+        encoding = get_encoding(model_name)
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= token_limit:
+            return text, len(tokens)
+
+        print(f"Token count: {len(tokens)}. Text too long. Truncating to {token_limit} tokens.")
+        # A cut inside a multi-byte character decodes to a replacement character, drop it
+        return encoding.decode(tokens[:token_limit]).rstrip("\ufffd"), len(tokens)
     
     def clean_text(self, text):
         # Clean the text: Remove extra spaces and newlines
@@ -125,44 +266,68 @@ class LinkWorker(Selenium):
         except Exception as e:
             print(f"Unexpected error in function: set_html_innerHTML: {e}")
             self.__body_html = "Page Error - Unexpected Error"
+        self.__parsed_page = None
 
-    # Parse the HTML content into text
-    def get_body_text(self):
-        soup = BeautifulSoup(self.__body_html, "html.parser")
-        all_text = soup.get_text(separator=" ")
-        
-        # Combine <iframe> and <frame> handling
+    # Retrieve the text of all <iframe> and <frame> elements once, while the page is loaded
+    def set_iframe_text(self):
         iframe_text = ""
         frames = self.__driver.find_elements(By.TAG_NAME, "iframe") + self.__driver.find_elements(By.TAG_NAME, "frame")
         for frame in frames:
             try:
                 self.__driver.switch_to.frame(frame)  # Switch to the frame/iframe
-                frame_soup = BeautifulSoup(self.__driver.page_source, "html.parser")
+                frame_soup = BeautifulSoup(self.__driver.page_source, HTML_PARSER)
                 iframe_text += frame_soup.get_text(separator=" ")
                 self.__driver.switch_to.default_content()  # Switch back to the main content
             except WebDriverException:
                 # Skip if the frame/iframe is restricted or inaccessible
                 continue
-        
-        # Combine the main content and iframe/frame content
-        all_text += "\n\n" + iframe_text
-        return self.clean_text(all_text)
+        self.__iframe_text = iframe_text
+        self.__parsed_page = None
+
+    # --- Page snapshot methods ---
+    # The innerHTML and iframe text fully describe a loaded page, so they can be stored and restored without a browser
+    def get_page_snapshot(self):
+        return self.__body_html, self.__iframe_text
+
+    # parsed_page can be passed when the snapshot was already parsed elsewhere (e.g. by the HTTP fetcher)
+    def set_page_snapshot(self, body_html, iframe_text, parsed_page=None):
+        self.__body_html = body_html
+        self.__iframe_text = iframe_text
+        self.__parsed_page = parsed_page
+
+    # The HTML of the current page is parsed once, text and links extraction share the tree
+    def get_parsed_page(self):
+        if self.__parsed_page is None:
+            self.__parsed_page = ParsedPage(self.__body_html, self.__iframe_text)
+        return self.__parsed_page
+
+    # Parse the HTML content into text
+    def get_body_text(self):
+        return self.get_parsed_page().get_text()
 
-    def scrape_page_content(self, model_name):
+    # With a boilerplate_stripper (one per site), text repeated across the site's pages is removed before the token limit is applied
+    def scrape_page_content(self, model_name, boilerplate_stripper=None):
         # print(self.__body_html)
 
-        all_text = self.get_body_text()
+        with RunMetrics.span("extract_text"):
+            all_text = self.get_body_text()
+            if boilerplate_stripper is not None:
+                stripped_text = boilerplate_stripper.strip(self.get_parsed_page())
 
         body_length = len(all_text)
         # print(f"Page character length: {body_length}")
-        tokens = self.count_tokens(all_text, model_name)
-            
-        while tokens > 8000:
-            print(f"Token count: {tokens}. Text too long. Truncating 1000 letters.")
-            all_text = all_text[:-1000]
-            tokens = self.count_tokens(all_text, model_name)
-        
-        # print(f"Token count in raw page: {tokens}")
+        token_limit = self.get_page_token_limit(model_name)
+        if boilerplate_stripper is None:
+            all_text, _ = self.truncate_to_tokens(all_text, model_name, token_limit)
+        else:
+            stripped_length = len(stripped_text)
+            stripped_text, stripped_tokens = self.truncate_to_tokens(stripped_text, model_name, token_limit)
+            # Nothing was saved if the stripper removed nothing. Otherwise the raw text is not encoded again,
+            # its token count is estimated at the stripped text's characters per token
+            if stripped_length < body_length:
+                raw_tokens = round(body_length * stripped_tokens / stripped_length) if stripped_length else self.count_tokens(all_text, model_name)
+                boilerplate_stripper.add_saved_tokens(max(min(raw_tokens, token_limit) - min(stripped_tokens, token_limit), 0))
+            all_text = stripped_text
 
         # Remove illegal characters that would not save in Excel
         all_text = escape(all_text)
@@ -170,12 +335,15 @@ class LinkWorker(Selenium):
         return all_text
     
     def scrape_page_links(self, source_url):
-        soup = BeautifulSoup(self.__body_html, "html.parser")
-        links = soup.find_all("a", href=True)
+        with RunMetrics.span("extract_links"):
+            return self.get_parsed_page().get_links(source_url, self.filter_page_links)
 
+    # Static so cached pages can be filtered without a browser (e.g. by the link ranker evaluation)
+    @staticmethod
+    def filter_page_links(source_url, anchors):
         same_domain_links = []
-        for link in links:
-            url_found = self.clean_url(urljoin(source_url, link['href']))  # Resolve relative URL and clean
+        for href, anchor_text in anchors:
+            url_found = LinkWorker.clean_url(urljoin(source_url, href))  # Resolve relative URL and clean
             parsed_link = urlparse(url_found)
             # print(f"Found URL: {url_found}")
 
@@ -0,0 +1,51 @@
+import sqlite3
+import threading
+import time
+import zlib
+
+# On-disk snapshots of loaded pages, keyed by the cleaned URL that was requested.
+# A snapshot holds the final (possibly redirected) URL, the innerHTML and the iframe text, compressed with zlib.
+class PageCache():
+    def __init__(self, filename, max_age_seconds=7 * 24 * 3600):
+        self.__max_age_seconds = max_age_seconds
+        self.__lock = threading.Lock()
+
+        self.__connection = sqlite3.connect(filename, check_same_thread=False)
+        self.__connection.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                final_url TEXT,
+                body_html BLOB,
+                iframe_text BLOB,
+                fetched_at REAL
+            )""")
+        self.__connection.commit()
+
+    # Returns a dict with final_url, body_html, iframe_text and fetched_at, or None if missing or stale
+    def get(self, url):
+        with self.__lock:
+            row = self.__connection.execute("SELECT final_url, body_html, iframe_text, fetched_at FROM pages WHERE url = ?", (url,)).fetchone()
+
+        if row is None:
+            return None
+
+        final_url, body_html, iframe_text, fetched_at = row
+        if time.time() - fetched_at > self.__max_age_seconds:
+            return None
+
+        return {
+            "final_url": final_url,
+            "body_html": zlib.decompress(body_html).decode("utf-8"),
+            "iframe_text": zlib.decompress(iframe_text).decode("utf-8"),
+            "fetched_at": fetched_at,
+        }
+
+    def put(self, url, final_url, body_html, iframe_text):
+        with self.__lock:
+            self.__connection.execute("INSERT OR REPLACE INTO pages (url, final_url, body_html, iframe_text, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                                      (url, final_url, zlib.compress(body_html.encode("utf-8")), zlib.compress(iframe_text.encode("utf-8")), time.time()))
+            self.__connection.commit()
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
@@ -0,0 +1,119 @@
+import re
+from bs4 import BeautifulSoup
+from bs4.element import PreformattedString
+from Classes.RunMetrics import RunMetrics
+
+# lxml is much faster on large pages, fall back to the built-in parser if it is not installed
+try:
+    import lxml
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+
+# One loaded page, parsed at most once. Text and links are extracted lazily and cached.
+class ParsedPage():
+    NON_TEXT_TAGS = ["script", "style", "noscript", "template"]
+    # Regions that are site chrome rather than page content
+    BOILERPLATE_TAGS = NON_TEXT_TAGS + ["nav", "footer", "aside", "iframe", "svg"]
+    BOILERPLATE_ROLES = ["navigation", "contentinfo", "menu", "menubar", "dialog", "alertdialog"]
+    BOILERPLATE_ATTRIBUTE_PATTERN = re.compile(r"(?:^|[-_\s])(?:nav|navbar|navigation|menu|footer|cookies?|consent|breadcrumbs?|skip-link)(?:$|[-_\s])", re.IGNORECASE)
+    # Page wrappers are never boilerplate, whatever their class says (e.g. <body class="has-navbar">)
+    PAGE_WRAPPER_TAGS = ["html", "body", "main"]
+    # If the regions removed nearly all text they were probably misdetected, the page is then kept whole
+    MIN_CONTENT_RATIO = 0.1
+    # Text under the same nearest block element forms one block
+    BLOCK_TAGS = ["p", "div", "section", "article", "main", "header", "li", "ul", "ol", "dl", "dt", "dd", "table", "tr", "td", "th",
+                  "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "figure", "figcaption", "form", "label", "button", "body"]
+
+    def __init__(self, body_html, iframe_text, parser=HTML_PARSER):
+        self.__body_html = body_html
+        self.__iframe_text = iframe_text
+        self.__parser = parser
+        self.__soup = None
+        self.__text = None
+        self.__anchors = None
+        self.__links = {}
+        self.__content_blocks = None
+
+    def get_soup(self):
+        if self.__soup is None:
+            with RunMetrics.span("parse"):
+                self.__soup = BeautifulSoup(self.__body_html, self.__parser)
+        return self.__soup
+
+    def get_body_html(self):
+        return self.__body_html
+
+    def get_iframe_text(self):
+        return self.__iframe_text
+
+    # Page text plus iframe text, whitespace collapsed
+    def get_text(self):
+        if self.__text is None:
+            all_text = self.get_soup().get_text(separator=" ")
+            # Combine the main content and iframe/frame content
+            all_text += "\n\n" + self.__iframe_text
+            self.__text = re.sub(r'\s+', ' ', all_text).strip()
+        return self.__text
+
+    # Text blocks outside of boilerplate regions (nav, footer, cookie banners, scripts, ...) in document order,
+    # whitespace collapsed, followed by the iframe text
+    def get_content_blocks(self):
+        if self.__content_blocks is None:
+            self.__content_blocks = self.__collect_blocks(skip_boilerplate=True)
+            if sum(len(block) for block in self.__content_blocks) < ParsedPage.MIN_CONTENT_RATIO * self.get_visible_text_length():
+                self.__content_blocks = self.__collect_blocks(skip_boilerplate=False)
+            if self.__iframe_text.strip():
+                self.__content_blocks.append(" ".join(self.__iframe_text.split()))
+        return self.__content_blocks
+
+    def __collect_blocks(self, skip_boilerplate):
+        blocks = []
+        current_block = None
+        current_strings = []
+        for string in self.get_soup().find_all(string=True):
+            if isinstance(string, PreformattedString):
+                continue  # Comments, doctypes, CDATA
+            block, is_boilerplate = self.__get_block(string)
+            if is_boilerplate and (skip_boilerplate or string.parent.name in ParsedPage.NON_TEXT_TAGS):
+                continue
+            if block is not current_block:
+                blocks.append(" ".join(" ".join(current_strings).split()))
+                current_block = block
+                current_strings = []
+            current_strings.append(string)
+        blocks.append(" ".join(" ".join(current_strings).split()))
+        return [block for block in blocks if block]
+
+    # Nearest block element of a string and whether it lies inside a boilerplate region
+    def __get_block(self, string):
+        block = None
+        for parent in string.parents:
+            if parent.name in ParsedPage.BOILERPLATE_TAGS or parent.get("role") in ParsedPage.BOILERPLATE_ROLES:
+                return block, True
+            if parent.name not in ParsedPage.PAGE_WRAPPER_TAGS and ParsedPage.BOILERPLATE_ATTRIBUTE_PATTERN.search(" ".join(parent.get("class") or []) + " " + (parent.get("id") or "")):
+                return block, True
+            if block is None and parent.name in ParsedPage.BLOCK_TAGS:
+                block = parent
+        return block, False
+
+    # Text outside of script/style elements, used to judge how much real content the page has
+    def get_visible_text_length(self):
+        visible_strings = [string for string in self.get_soup().find_all(string=True) if string.parent is not None and string.parent.name not in ParsedPage.NON_TEXT_TAGS]
+        return len(" ".join(" ".join(visible_strings).split()))
+
+    def get_script_length(self):
+        return sum(len(script.get_text()) for script in self.get_soup().find_all("script"))
+
+    # (href, anchor text) of every <a href> in document order
+    def get_anchors(self):
+        if self.__anchors is None:
+            self.__anchors = [(link["href"], " ".join(link.get_text(separator=" ").split())) for link in self.get_soup().find_all("a", href=True)]
+        return self.__anchors
+
+    # Links filtered by the caller, cached per source URL
+    def get_links(self, source_url, link_filter):
+        if source_url not in self.__links:
+            self.__links[source_url] = link_filter(source_url, self.get_anchors())
+        return self.__links[source_url]
@@ -1,4 +1,7 @@
 class Prompts():
+    # Increase when a prompt changes, answers stored by an earlier version are not reused (see ContentFingerprints)
+    VERSION = 1
+
     def __init__(self, total_use_cases):
         self.__total_use_cases = total_use_cases
         self.__use_english_prompt = f"Respond in English.\n\n"
@@ -0,0 +1,186 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+import openai
+from Classes.RunMetrics import RunMetrics
+
+# Shared scheduler in front of every OpenAI chat call. Requests and tokens per minute are tracked per model in a
+# sliding 60 second window, calls wait until they fit under the limits, and 429/5xx answers are retried with
+# jittered exponential backoff. On a 429 the model's limits are lowered and then slowly raised again on success.
+class RateLimiter():
+    WINDOW_SECONDS = 60
+    DEFAULT_LIMITS = (500, 200000)  # (requests per minute, tokens per minute) for models without configured limits
+    CHARS_PER_TOKEN = 4  # Prompt tokens are estimated before the call and corrected with the usage of the answer
+    EXPECTED_OUTPUT_TOKENS = 1000
+    MAX_RETRIES = 5
+    BACKOFF_BASE_SECONDS = 1
+    BACKOFF_MAX_SECONDS = 60
+    MIN_LIMIT_FACTOR = 0.2  # A 429 never lowers a limit below this share of the configured one
+    LIMIT_DECREASE_FACTOR = 0.7
+    LIMIT_INCREASE_STEP = 0.02
+
+    def __init__(self, model_limits=None):
+        # {model_name: (requests_per_minute, tokens_per_minute)}
+        self.__model_limits = dict(model_limits or {})
+        self.__lock = threading.Lock()
+        self.__windows = {}
+        self.__limit_factors = {}
+        self.__metrics = {}
+
+    # --- Scheduling methods ---
+    def __get_limits(self, model_name):
+        requests_per_minute, tokens_per_minute = self.__model_limits.get(model_name, RateLimiter.DEFAULT_LIMITS)
+        limit_factor = self.__limit_factors.get(model_name, 1.0)
+        return requests_per_minute * limit_factor, tokens_per_minute * limit_factor
+
+    # Reserve a slot for the call, or return how many seconds to wait before trying again
+    def __try_reserve(self, model_name, estimated_tokens):
+        with self.__lock:
+            now = time.monotonic()
+            window = self.__windows.setdefault(model_name, deque())
+            while window and window[0][0] <= now - RateLimiter.WINDOW_SECONDS:
+                window.popleft()
+
+            requests_per_minute, tokens_per_minute = self.__get_limits(model_name)
+            used_tokens = sum(reservation[1] for reservation in window)
+            # A single call larger than the whole budget is let through once the window is empty
+            fits_tokens = used_tokens + estimated_tokens <= tokens_per_minute or not window
+            if len(window) < requests_per_minute and fits_tokens:
+                reservation = [now, estimated_tokens]
+                window.append(reservation)
+                return reservation, 0
+
+            return None, max(window[0][0] + RateLimiter.WINDOW_SECONDS - now, 0.05)
+
+    def __release(self, reservation, used_tokens):
+        with self.__lock:
+            reservation[1] = used_tokens
+
+    def __estimate_tokens(self, messages):
+        prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
+        return prompt_chars // RateLimiter.CHARS_PER_TOKEN + RateLimiter.EXPECTED_OUTPUT_TOKENS
+
+    # --- Backoff methods ---
+    def __is_retryable(self, error):
+        if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+            return True
+        return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+    # Full jitter, or the server's Retry-After if it sent one
+    def __get_backoff_seconds(self, error, attempt):
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after is not None:
+            try:
+                return float(retry_after) + random.uniform(0, 1)
+            except ValueError:
+                pass
+        return random.uniform(0, min(RateLimiter.BACKOFF_MAX_SECONDS, RateLimiter.BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    def __adapt_limits(self, model_name, rate_limited):
+        with self.__lock:
+            limit_factor = self.__limit_factors.get(model_name, 1.0)
+            if rate_limited:
+                limit_factor = max(limit_factor * RateLimiter.LIMIT_DECREASE_FACTOR, RateLimiter.MIN_LIMIT_FACTOR)
+            else:
+                limit_factor = min(limit_factor + RateLimiter.LIMIT_INCREASE_STEP, 1.0)
+            self.__limit_factors[model_name] = limit_factor
+
+    # --- Call methods ---
+    # Run request() (a chat completion call) under the model's limits, returns its response
+    def run(self, model_name, messages, request):
+        estimated_tokens = self.__estimate_tokens(messages)
+        queue_wait = 0
+        for attempt in range(RateLimiter.MAX_RETRIES + 1):
+            reservation, wait_seconds = self.__try_reserve(model_name, estimated_tokens)
+            while reservation is None:
+                time.sleep(wait_seconds)
+                queue_wait += wait_seconds
+                reservation, wait_seconds = self.__try_reserve(model_name, estimated_tokens)
+
+            start_time = time.monotonic()
+            try:
+                response = request()
+            except Exception as e:
+                if not self.__is_retryable(e) or attempt == RateLimiter.MAX_RETRIES:
+                    raise
+                backoff_seconds = self.__on_error(model_name, e, attempt)
+                time.sleep(backoff_seconds)
+                queue_wait += backoff_seconds
+                continue
+
+            self.__on_success(model_name, reservation, response, queue_wait, time.monotonic() - start_time)
+            return response
+
+    # Same as run for the async client, request() returns an awaitable. Waiting does not block the event loop
+    async def run_async(self, model_name, messages, request):
+        estimated_tokens = self.__estimate_tokens(messages)
+        queue_wait = 0
+        for attempt in range(RateLimiter.MAX_RETRIES + 1):
+            reservation, wait_seconds = self.__try_reserve(model_name, estimated_tokens)
+            while reservation is None:
+                await asyncio.sleep(wait_seconds)
+                queue_wait += wait_seconds
+                reservation, wait_seconds = self.__try_reserve(model_name, estimated_tokens)
+
+            start_time = time.monotonic()
+            try:
+                response = await request()
+            except Exception as e:
+                if not self.__is_retryable(e) or attempt == RateLimiter.MAX_RETRIES:
+                    raise
+                backoff_seconds = self.__on_error(model_name, e, attempt)
+                await asyncio.sleep(backoff_seconds)
+                queue_wait += backoff_seconds
+                continue
+
+            self.__on_success(model_name, reservation, response, queue_wait, time.monotonic() - start_time)
+            return response
+
+    def __on_success(self, model_name, reservation, response, queue_wait, api_latency):
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.__release(reservation, usage.prompt_tokens + usage.completion_tokens)
+        self.__adapt_limits(model_name, rate_limited=False)
+        self.__record_metrics(model_name, queue_wait=queue_wait, api_latency=api_latency)
+        RunMetrics.record_duration(f"llm:{model_name}", api_latency)
+        RunMetrics.record_duration(f"llm_queue:{model_name}", queue_wait)
+
+    # A failed call still counts as a request in the window, returns the backoff in seconds
+    def __on_error(self, model_name, error, attempt):
+        rate_limited = isinstance(error, openai.RateLimitError)
+        if rate_limited:
+            self.__adapt_limits(model_name, rate_limited=True)
+        backoff_seconds = self.__get_backoff_seconds(error, attempt)
+        print(f"{model_name}: {error.__class__.__name__}, retrying in {backoff_seconds:.1f}s")
+        self.__record_metrics(model_name, retries=1, rate_limited=int(rate_limited))
+        return backoff_seconds
+
+    # --- Metrics methods ---
+    def __record_metrics(self, model_name, queue_wait=0, api_latency=None, retries=0, rate_limited=0):
+        with self.__lock:
+            metrics = self.__metrics.setdefault(model_name, {"calls": 0, "queue_wait": 0, "api_latency": 0, "retries": 0, "rate_limited": 0})
+            if api_latency is not None:
+                metrics["calls"] += 1
+                metrics["queue_wait"] += queue_wait
+                metrics["api_latency"] += api_latency
+            metrics["retries"] += retries
+            metrics["rate_limited"] += rate_limited
+
+    # {model_name: {"calls", "queue_wait", "api_latency", "retries", "rate_limited"}}, times are totals in seconds
+    def get_metrics(self):
+        with self.__lock:
+            return {model_name: dict(metrics) for model_name, metrics in self.__metrics.items()}
+
+    # Metrics only, the adapted limits are kept
+    def reset_metrics(self):
+        with self.__lock:
+            self.__metrics = {}
+
+    def print_metrics(self):
+        for model_name, metrics in self.get_metrics().items():
+            calls = max(metrics["calls"], 1)
+            print(f"LLM scheduler {model_name}: {metrics['calls']} calls, {metrics['queue_wait'] / calls:.2f}s average queue wait, "
+                  f"{metrics['api_latency'] / calls:.2f}s average API latency, {metrics['retries']} retries ({metrics['rate_limited']} rate limited)")
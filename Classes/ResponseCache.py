@@ -0,0 +1,86 @@
+import sqlite3
+import threading
+import hashlib
+import json
+import time
+
+# Disk-backed cache of LLM answers, keyed by a hash of (model, messages, request parameters).
+# Entries expire after ttl_seconds and the least recently used ones are evicted above max_entries.
+# Eviction runs every EVICTION_INTERVAL puts, or as soon as the (counted, not queried) number of entries passes max_entries.
+class ResponseCache():
+    EVICTION_INTERVAL = 1000
+
+    def __init__(self, filename, ttl_seconds=30 * 24 * 3600, max_entries=200000):
+        self.__ttl_seconds = ttl_seconds
+        self.__max_entries = max_entries
+        self.__lock = threading.Lock()
+
+        self.__connection = sqlite3.connect(filename, check_same_thread=False)
+        self.__connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                answer TEXT,
+                input_tokens INTEGER,
+                output_tokens INTEGER,
+                created_at REAL,
+                last_used_at REAL,
+                hits INTEGER DEFAULT 0
+            )""")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used_at ON responses (last_used_at)")
+        self.__connection.commit()
+
+        # Upper bound of the entries in the table (a replaced key is counted again), corrected on every eviction
+        self.__entry_count = self.__connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        self.__puts_since_eviction = 0
+
+    @staticmethod
+    def make_key(model_name, messages, params=None):
+        payload = json.dumps({"model": model_name, "messages": messages, "params": params or {}}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # Returns [answer, input_tokens, output_tokens] or None on a miss
+    def get(self, key):
+        now = time.time()
+        with self.__lock:
+            row = self.__connection.execute("SELECT answer, input_tokens, output_tokens, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            answer, input_tokens, output_tokens, created_at = row
+            if now - created_at > self.__ttl_seconds:
+                self.__connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.__connection.commit()
+                return None
+
+            self.__connection.execute("UPDATE responses SET last_used_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self.__connection.commit()
+            return [answer, input_tokens, output_tokens]
+
+    def put(self, key, model_name, answer, input_tokens, output_tokens):
+        now = time.time()
+        with self.__lock:
+            self.__connection.execute("INSERT OR REPLACE INTO responses (key, model, answer, input_tokens, output_tokens, created_at, last_used_at, hits) VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                                      (key, model_name, answer, input_tokens, output_tokens, now, now))
+            self.__entry_count += 1
+            self.__puts_since_eviction += 1
+            if self.__puts_since_eviction >= ResponseCache.EVICTION_INTERVAL or self.__entry_count > self.__max_entries:
+                self.__evict(now)
+            self.__connection.commit()
+
+    # Drop expired entries, then the least recently used ones above the size limit. A full cache is trimmed a little
+    # below the limit, so the following puts do not evict one entry each
+    def __evict(self, now):
+        self.__connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.__ttl_seconds,))
+        total_entries = self.__connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if total_entries > self.__max_entries:
+            target_entries = self.__max_entries - min(ResponseCache.EVICTION_INTERVAL, self.__max_entries // 10)
+            self.__connection.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used_at ASC LIMIT ?)", (total_entries - target_entries,))
+            total_entries = target_entries
+        self.__entry_count = total_entries
+        self.__puts_since_eviction = 0
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
@@ -0,0 +1,85 @@
+import os
+import json
+import time
+import threading
+from Utilities.Excel import write_rows_to_excel, remove_illegal_characters
+
+# Result rows are appended to a JSONL journal (flushed and fsynced per row) and the .xlsx is only
+# rebuilt from the journal every export_interval_seconds and on close, instead of re-saving the workbook per row.
+# With resume=True the rows of an earlier run are kept and new rows are appended after them.
+class ResultSink():
+    def __init__(self, output_filename, sheet_title="AI Use Cases", export_interval_seconds=600, journal_filename=None, resume=False):
+        self.__output_filename = output_filename
+        self.__sheet_title = sheet_title
+        self.__export_interval_seconds = export_interval_seconds
+        self.__journal_filename = journal_filename or f"{os.path.splitext(output_filename)[0]}.jsonl"
+        self.__lock = threading.Lock()
+
+        self.__has_headers = False
+        if resume and os.path.exists(self.__journal_filename):
+            self.__has_headers = self.__repair_journal()
+            self.__journal = open(self.__journal_filename, "a", encoding="utf-8")
+        else:
+            self.__journal = open(self.__journal_filename, "w", encoding="utf-8")
+        self.__last_export_time = time.time()
+
+    # Drop a half-written last line left by a crash, so appended rows start on a new line. Returns True if headers were written
+    def __repair_journal(self):
+        with open(self.__journal_filename, "rb+") as journal:
+            content = journal.read()
+            if content and not content.endswith(b"\n"):
+                journal.truncate(content.rfind(b"\n") + 1)
+        return content.startswith(b'{"headers"')
+
+    def get_journal_filename(self):
+        return self.__journal_filename
+
+    # Headers are written once, before the first row. A failed periodic export is only logged, the row is in the journal
+    # and the next export (at the latest on close) tries again
+    def write_row(self, row, headers=None):
+        with self.__lock:
+            if not self.__has_headers and headers is not None:
+                self.__append_line({"headers": headers})
+                self.__has_headers = True
+
+            self.__append_line({"row": remove_illegal_characters(row)})
+
+            if time.time() - self.__last_export_time >= self.__export_interval_seconds:
+                try:
+                    self.__export()
+                except Exception as e:
+                    print(f"Could not export results to {self.__output_filename}: {e}")
+                    self.__last_export_time = time.time()
+
+    def __append_line(self, record):
+        self.__journal.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.__journal.flush()
+        os.fsync(self.__journal.fileno())
+
+    def read_rows(self):
+        rows = []
+        with open(self.__journal_filename, "r", encoding="utf-8") as journal:
+            for line in journal:
+                # A crash can leave a half-written last line
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                rows.append(record["headers"] if "headers" in record else record["row"])
+        return rows
+
+    def export(self):
+        with self.__lock:
+            self.__export()
+
+    def __export(self):
+        write_rows_to_excel(self.__output_filename, self.__sheet_title, self.read_rows())
+        self.__last_export_time = time.time()
+        print(f"Exported results to {self.__output_filename}")
+
+    def close(self):
+        with self.__lock:
+            try:
+                self.__export()
+            finally:
+                self.__journal.close()
@@ -0,0 +1,68 @@
+import sqlite3
+import threading
+import json
+import time
+
+# Per-startup checkpoints of a run, so a restarted run skips finished startups and resumes the others
+# from their last finished stage without repeating LLM calls that already succeeded.
+class RunManifest():
+    STAGES = ["links", "pages", "description", "ai_check", "written"]
+
+    def __init__(self, filename, resume=False):
+        self.__lock = threading.Lock()
+
+        self.__connection = sqlite3.connect(filename, check_same_thread=False)
+        self.__connection.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                startup_key TEXT,
+                stage TEXT,
+                data TEXT,
+                updated_at REAL,
+                PRIMARY KEY (startup_key, stage)
+            )""")
+        # A new run starts from an empty manifest
+        if not resume:
+            self.__connection.execute("DELETE FROM checkpoints")
+        self.__connection.commit()
+
+    @staticmethod
+    def make_key(startup_name, url):
+        return f"{startup_name}|{url}"
+
+    # All finished stages of a startup: {stage: data}
+    def get_stages(self, startup_key):
+        with self.__lock:
+            rows = self.__connection.execute("SELECT stage, data FROM checkpoints WHERE startup_key = ?", (startup_key,)).fetchall()
+        return {stage: json.loads(data) for stage, data in rows}
+
+    def set_stage(self, startup_key, stage, data=None):
+        if stage not in RunManifest.STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+
+        with self.__lock:
+            self.__connection.execute("INSERT OR REPLACE INTO checkpoints (startup_key, stage, data, updated_at) VALUES (?, ?, ?, ?)",
+                                      (startup_key, stage, json.dumps(data, ensure_ascii=False), time.time()))
+            self.__connection.commit()
+
+    # (startup_key, data) of every startup that finished the stage
+    def get_stage_entries(self, stage):
+        with self.__lock:
+            rows = self.__connection.execute("SELECT startup_key, data FROM checkpoints WHERE stage = ?", (stage,)).fetchall()
+        return [(startup_key, json.loads(data)) for startup_key, data in rows]
+
+    def is_written(self, startup_key):
+        with self.__lock:
+            row = self.__connection.execute("SELECT 1 FROM checkpoints WHERE startup_key = ? AND stage = 'written'", (startup_key,)).fetchone()
+        return row is not None
+
+    # Number of startups that reached each stage
+    def get_stage_counts(self):
+        with self.__lock:
+            rows = self.__connection.execute("SELECT stage, COUNT(*) FROM checkpoints GROUP BY stage").fetchall()
+        stage_counts = {stage: 0 for stage in RunManifest.STAGES}
+        stage_counts.update(dict(rows))
+        return stage_counts
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
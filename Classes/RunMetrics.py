@@ -0,0 +1,80 @@
+import json
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+# Process-wide timing spans of a run. Durations are kept per stage (page load, cookie handling,
+# scrolling, parsing, each LLM model, ...), token costs come from the run's CostLedger.
+class RunMetrics():
+    PERCENTILES = [50, 95, 99]
+
+    __lock = threading.Lock()
+    __durations = {}
+    __started_at = time.time()
+
+    # --- Recording methods ---
+    @classmethod
+    def record_duration(cls, stage, seconds):
+        with cls.__lock:
+            cls.__durations.setdefault(stage, []).append(seconds)
+
+    # with RunMetrics.span("scroll"): ... records how long the block took, also when it raises
+    @classmethod
+    @contextmanager
+    def span(cls, stage):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.record_duration(stage, time.perf_counter() - start_time)
+
+    # Start over, e.g. for the next job of a long-running worker
+    @classmethod
+    def reset(cls):
+        with cls.__lock:
+            cls.__durations = {}
+            cls.__started_at = time.time()
+
+    # --- Report methods ---
+    # Nearest-rank percentile of an unsorted list
+    @staticmethod
+    def percentile(values, percent):
+        sorted_values = sorted(values)
+        rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+        return sorted_values[rank - 1]
+
+    # Latency percentiles per stage, plus the costs per run, stage and startup if a cost_ledger is given
+    @classmethod
+    def get_report(cls, cost_ledger=None, content_fingerprints=None):
+        with cls.__lock:
+            durations = {stage: list(seconds) for stage, seconds in cls.__durations.items()}
+
+        latencies = {}
+        for stage, seconds in sorted(durations.items()):
+            latencies[stage] = {"count": len(seconds), "total_seconds": sum(seconds), "mean_seconds": sum(seconds) / len(seconds), "max_seconds": max(seconds)}
+            for percent in RunMetrics.PERCENTILES:
+                latencies[stage][f"p{percent}_seconds"] = RunMetrics.percentile(seconds, percent)
+
+        report = {"started_at": cls.__started_at, "finished_at": time.time(), "latencies": latencies}
+        if cost_ledger is not None:
+            report["costs"] = cost_ledger.get_report()
+        if content_fingerprints is not None:
+            report["recrawl"] = content_fingerprints.get_report()
+        return report
+
+    # Writes the report as JSON and prints the latency percentiles, cost per stage and re-crawl counts
+    @classmethod
+    def write_report(cls, filename, cost_ledger=None, content_fingerprints=None):
+        report = cls.get_report(cost_ledger, content_fingerprints)
+        with open(filename, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=2)
+
+        for stage, latency in report["latencies"].items():
+            print(f"{stage}: {latency['count']}x, p50 {latency['p50_seconds']:.2f}s, p95 {latency['p95_seconds']:.2f}s, p99 {latency['p99_seconds']:.2f}s")
+        for stage, totals in report.get("costs", {}).get("stages", {}).items():
+            print(f"{stage}: {totals['llm_calls']} LLM calls, {totals['input_tokens']} input / {totals['output_tokens']} output tokens, ${totals['cost']:.4f}")
+        if "recrawl" in report:
+            print(f"Re-crawl: {len(report['recrawl']['reused'])} startups unchanged and reused, {len(report['recrawl']['refreshed'])} refreshed")
+        print(f"Run report written to {filename}")
+        return report
@@ -1,9 +1,35 @@
 from selenium import webdriver
 import tempfile
+import shutil
 
+# psutil gives the memory of the whole Chrome process tree, without it only the page's JS heap is known
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Browser profiles: "full" loads everything like a normal Chrome, "text_only" blocks what we never read
+# (images, media, fonts and ad/analytics hosts), we only use the page text and <a href>s
 class Selenium():
-    def __init__(self):
+    PROFILES = ["full", "text_only"]
+    # Chrome DevTools URL patterns blocked by the text-only profile, images are switched off through the prefs
+    TEXT_ONLY_BLOCKED_URLS = [
+        "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+        "*.mp4", "*.webm", "*.ogg", "*.mp3", "*.wav", "*.m4a", "*.mov",
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*", "*googleadservices.com*",
+        "*connect.facebook.net*", "*hotjar.com*", "*clarity.ms*", "*snap.licdn.com*", "*ads.linkedin.com*",
+        "*bat.bing.com*", "*cdn.segment.com*", "*mixpanel.com*", "*js.hs-analytics.net*", "*static.ads-twitter.com*",
+        "*analytics.tiktok.com*", "*fonts.googleapis.com*", "*fonts.gstatic.com*", "*use.typekit.net*",
+        "*youtube.com/embed*", "*player.vimeo.com*",
+    ]
+
+    def __init__(self, browser_profile="full"):
+        if browser_profile not in Selenium.PROFILES:
+            raise ValueError(f"Unknown browser profile: {browser_profile}")
+
         unique_dir = tempfile.mkdtemp()
+        self.__profile_dir = unique_dir
+        self.__browser_profile = browser_profile
         # chrome_profile_path = r"C:\Users\ShahrukhAzharAhsan\AppData\Local\Google\Chrome\User Data"
 
         chrome_options = webdriver.ChromeOptions()
@@ -24,7 +50,14 @@ class Selenium():
         # Disable GPU
         # chrome_options.add_argument("--disable-gpu")  # Disables GPU acceleration
         # chrome_options.add_argument("--disable-software-rasterizer")  # Further prevents GPU issues
-        chrome_options.add_argument("--enable-webgl")
+        if browser_profile == "text_only":
+            # No images, no autoplay and no GPU work, nothing of it ends up in the page text
+            chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+            chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+            chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+            chrome_options.add_argument("--disable-gpu")
+        else:
+            chrome_options.add_argument("--enable-webgl")
 
 
         # Ignore SSL warnings
@@ -32,8 +65,72 @@ class Selenium():
         chrome_options.add_argument("--allow-insecure-localhost")
 
 
-        self.__driver = webdriver.Chrome(options=chrome_options)
+        try:
+            self.__driver = webdriver.Chrome(options=chrome_options)
+        except Exception:
+            # Nothing else removes the profile dir of a driver that never started
+            shutil.rmtree(unique_dir, ignore_errors=True)
+            raise
+
+        if browser_profile == "text_only":
+            self.__driver.execute_cdp_cmd("Network.enable", {})
+            self.__driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": Selenium.TEXT_ONLY_BLOCKED_URLS})
 
 
         # self.__driver = None
         return self.__driver
+
+    def get_browser_profile(self):
+        return self.__browser_profile
+
+    # Load time and bytes transferred of the current page, from the browser's Navigation/Resource Timing API.
+    # With a url, that URL is loaded first exactly as given (no URL cleaning, e.g. for a local fixture site)
+    def get_page_load_stats(self, url=None):
+        if url is not None:
+            self.__driver.get(url)
+        return self.__driver.execute_script("""
+            const navigation = performance.getEntriesByType("navigation")[0];
+            const resources = performance.getEntriesByType("resource");
+            return {
+                load_seconds: navigation ? navigation.loadEventEnd / 1000 : null,
+                transferred_bytes: (navigation ? navigation.transferSize : 0) + resources.reduce((total, resource) => total + resource.transferSize, 0),
+                resources: resources.length,
+            };
+        """)
+
+    # Drop Chrome's HTTP cache, so the next load transfers every resource again
+    def clear_browser_cache(self):
+        self.__driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+
+    # --- Driver health methods ---
+    def get_profile_dir(self):
+        return self.__profile_dir
+
+    # The profile dir is only removed after the driver has quit
+    def delete_profile_dir(self):
+        shutil.rmtree(self.__profile_dir, ignore_errors=True)
+
+    def is_responsive(self):
+        try:
+            return self.__driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    # Resident memory of chromedriver and all Chrome processes it started, in MB. None if it cannot be measured (no psutil)
+    def get_memory_mb(self):
+        if psutil is None:
+            return None
+        try:
+            driver_process = psutil.Process(self.__driver.service.process.pid)
+            processes = [driver_process] + driver_process.children(recursive=True)
+            return sum(process.memory_info().rss for process in processes) / (1024 * 1024)
+        except Exception:
+            return None
+
+    # JS heap of the current page in MB, only a fraction of the browser's memory. None if it cannot be measured
+    def get_js_heap_mb(self):
+        try:
+            js_heap_bytes = self.__driver.execute_script("return performance.memory ? performance.memory.usedJSHeapSize : null")
+            return js_heap_bytes / (1024 * 1024) if js_heap_bytes is not None else None
+        except Exception:
+            return None
@@ -1,50 +1,19 @@
 from Classes.LinkWorker import LinkWorker
 from selenium.common.exceptions import TimeoutException
+from Classes.RunMetrics import RunMetrics
 
 class WebScraper(LinkWorker):
-    def __init__(self):
-        self.__driver = super().__init__()
-        self.__total_token_cost = 0
+    # browser_profile is "full" or "text_only", see Selenium.PROFILES
+    def __init__(self, page_cache=None, http_fetcher=None, browser_profile="full"):
+        self.__driver = super().__init__(browser_profile)
+        # Optional PageCache, pages found in it are served without the browser
+        self.__page_cache = page_cache
+        # Optional HttpFetcher, static pages are fetched with a plain GET before trying the browser
+        self.__http_fetcher = http_fetcher
         self.__redirected_url = ""
-
-    def set_token_cost(self, input_tokens, output_tokens, model_name):
-        if model_name == "chatgpt-4o-latest":
-            input_cost = (input_tokens / 1000) * 0.005
-            output_cost = (output_tokens / 1000) * 0.015
-            self.__total_token_cost += input_cost + output_cost
-        elif model_name == "gpt-4o-mini":
-            input_cost = (input_tokens / 1000) * 0.00015
-            output_cost = (output_tokens / 1000) * 0.0006
-            self.__total_token_cost += input_cost + output_cost
-        elif model_name == "o3-mini":
-            input_cost = (input_tokens / 1000) * 0.0011
-            output_cost = (output_tokens / 1000) * 0.0044
-            self.__total_token_cost += input_cost + output_cost
-        elif model_name == "gpt-4o":
-            input_cost = (input_tokens / 1000) * 0.0025
-            output_cost = (output_tokens / 1000) * 0.01
-            self.__total_token_cost += input_cost + output_cost
-        elif model_name == "claude-3-7-sonnet-20250219":
-            input_cost = (input_tokens / 1000) * 0.003
-            output_cost = (output_tokens / 1000) * 0.015
-            self.__total_token_cost += input_cost + output_cost
-        elif model_name == "deepseek-reasoner":
-            input_cost = (input_tokens / 1000) * 0.00014
-            output_cost = (output_tokens / 1000) * 0.00219
-            self.__total_token_cost += input_cost + output_cost
-        elif model_name == "o3":
-            input_cost = (input_tokens / 1000) * 0.002
-            output_cost = (output_tokens / 1000) * 0.008
-            self.__total_token_cost += input_cost + output_cost
-        else:
-            raise ValueError("Model name not recognized. Token cost not calculated.")
-
-    # --- Token methods ---
-    def get_token_cost(self):
-        return self.__total_token_cost
-
-    def reset_token_cost(self):
-        self.__total_token_cost = 0
+        # Browser page loads since the driver was launched and failed loads in a row, used by BrowserPool to decide when to recycle it
+        self.__driver_page_count = 0
+        self.__driver_error_count = 0
 
     # --- URL methods ---
     def get_url(self):
@@ -65,6 +34,11 @@ class WebScraper(LinkWorker):
         self.__redirected_url = ""
 
     def open_url(self):
+        with RunMetrics.span("open_url"):
+            return self.__open_url()
+
+    def __open_url(self):
+        self.__driver_page_count += 1
         try:
             self.__driver.set_page_load_timeout(15)  # Set the timeout to 15 seconds
             self.__driver.get(self.__url)
@@ -73,19 +47,82 @@ class WebScraper(LinkWorker):
                 print(f"Redirected to {self.__driver.current_url}")
                 self.set_redirect_url(self.__driver.current_url)
                 self.set_url(self.__driver.current_url)
+            self.__driver_error_count = 0
             return 200
         except TimeoutException:
+            self.__driver_error_count += 1
             print(f"Page load timeout: {self.__url}.")
             # self.__driver.execute_script("window.stop();")  # Stop the loading
             return 0
         except Exception as e:
+            self.__driver_error_count += 1
             print(f"Page Error - Error opening {self.__url}")
             return 0 # General Error
 
     def quit_driver(self):
         self.__driver.quit()
 
+    def get_driver_page_count(self):
+        return self.__driver_page_count
+
+    def get_driver_error_count(self):
+        return self.__driver_error_count
+
+    # Restore a fresh snapshot of the current URL from the page cache. Returns True on a hit
+    def load_cached_page(self):
+        if self.__page_cache is None:
+            return False
+
+        snapshot = self.__page_cache.get(self.get_url())
+        if snapshot is None:
+            return False
+
+        if snapshot["final_url"] != self.get_url():
+            print(f"Redirected to {snapshot['final_url']} (cached)")
+            self.set_redirect_url(snapshot["final_url"])
+            self.set_url(snapshot["final_url"])
+
+        self.set_page_snapshot(snapshot["body_html"], snapshot["iframe_text"])
+        return True
+
+    # Fetch the current URL with a plain HTTP GET. Returns False if the page needs the browser
+    def load_http_page(self):
+        if self.__http_fetcher is None:
+            return False
+
+        with RunMetrics.span("http_fetch"):
+            final_url, parsed_page = self.__http_fetcher.fetch(self.get_url())
+        if parsed_page is None:
+            return False
+
+        if final_url != self.get_url():
+            print(f"Redirected to {final_url}")
+            self.set_redirect_url(final_url)
+            self.set_url(final_url)
+
+        self.set_page_snapshot(parsed_page.get_body_html(), "", parsed_page)
+        return True
+
+    def record_tier(self, tier):
+        if self.__http_fetcher is not None:
+            self.__http_fetcher.record_tier(tier)
+
+    # Tiers, cheapest first: page cache, plain HTTP, Selenium
     def load_page(self):
+        with RunMetrics.span("page_load"):
+            return self.__load_page()
+
+    def __load_page(self):
+        if self.load_cached_page():
+            self.record_tier("cache")
+            return True
+
+        requested_url = self.get_url()
+        if self.load_http_page():
+            self.record_tier("http")
+            self.store_page_snapshot(requested_url)
+            return True
+
         status = self.open_url()
         # If there was a DNS failure, toggle the www. part and try again
         if status == 0:  
@@ -100,24 +137,41 @@ class WebScraper(LinkWorker):
                 if status == 0:
                     print("Toggling www did not work.")
                     self.set_url(current_url)  # Reset to original URL
+                    self.record_tier("failed")
                     return False  # Return False to indicate page load failed
                 else:
                     self.set_redirect_url(self.get_url())
 
         if status == 0:
+            self.record_tier("failed")
             return False  # Return False if page load failed
 
         self.cookie_acceptor()
         self.page_scroller()
-        self.set_html_innerHTML()
+        with RunMetrics.span("page_snapshot"):
+            self.set_html_innerHTML()
+            self.set_iframe_text()
+        self.record_tier("selenium")
+        self.store_page_snapshot(requested_url)
+
         return True  # Return True if page load succeeded
 
-    def get_page_content(self, model_name):
-        page_content = self.scrape_page_content(model_name)
+    # Store the loaded page under the URL it was requested with, unless the page itself failed to load
+    def store_page_snapshot(self, requested_url):
+        body_html, iframe_text = self.get_page_snapshot()
+        if self.__page_cache is not None and not body_html.startswith("Page Error"):
+            self.__page_cache.put(requested_url, self.get_url(), body_html, iframe_text)
+
+    def get_page_content(self, model_name, boilerplate_stripper=None):
+        page_content = self.scrape_page_content(model_name, boilerplate_stripper)
         return page_content
     
     def get_page_links(self):
         page_links = self.scrape_page_links(self.__url)
         return page_links
 
+    # (href, anchor text) of every link on the current page
+    def get_page_anchors(self):
+        return self.get_parsed_page().get_anchors()
+
 
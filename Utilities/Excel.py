@@ -1,4 +1,6 @@
+import os
 import openpyxl
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 
 def load_startups_excel(filename):
     sheet = openpyxl.load_workbook(filename)["AISL2025"]
@@ -10,4 +12,20 @@ def create_results_file():
     output_sheet = output_wb.active
     output_sheet.title = "AI Use Cases"
 
-    return output_sheet, output_wb
\ No newline at end of file
+    return output_sheet, output_wb
+
+# Control characters (e.g. in an LLM answer) cannot be stored in a worksheet, openpyxl raises on them
+def remove_illegal_characters(row):
+    return [ILLEGAL_CHARACTERS_RE.sub("", value) if isinstance(value, str) else value for value in row]
+
+# Write all rows at once with a write-only workbook. The file is written next to the target and then
+# swapped in, so a crash during the export never leaves a half-written workbook behind.
+def write_rows_to_excel(filename, sheet_title, rows):
+    output_wb = openpyxl.Workbook(write_only=True)
+    output_sheet = output_wb.create_sheet(sheet_title)
+    for row in rows:
+        output_sheet.append(remove_illegal_characters(row))
+
+    temp_filename = f"{filename}.tmp"
+    output_wb.save(temp_filename)
+    os.replace(temp_filename, filename)
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import tempfile
+from Classes.HttpFetcher import HttpFetcher
+from Classes.ParsedPage import ParsedPage
+from Classes.WebScraper import WebScraper
+from Utilities.benchmark_profiles import serve_fixture_site
+
+STATIC_PAGE = "<html><body><h1>ACME</h1>" + "<p>We build machine learning products for factories and computer vision inspection.</p>" * 40 + "</body></html>"
+SHELL_PAGE = '<html><body><noscript>You need to enable JavaScript to run this app.</noscript><div id="root"></div><script src="/bundle.js"></script></body></html>'
+
+
+# Write the static and the shell fixture page into directory, returns their file names
+def write_fixture_pages(directory):
+    fixture_pages = {"static.html": STATIC_PAGE, "shell.html": SHELL_PAGE}
+    for filename, html in fixture_pages.items():
+        with open(os.path.join(directory, filename), "w", encoding="utf-8") as page_file:
+            page_file.write(html)
+    return list(fixture_pages)
+
+
+# The shell heuristics must accept the static page and reject the shell, and the HTTP tier must serve only the static page.
+# Returns the failed checks
+def check_http_fetcher(fixture_url, http_fetcher):
+    failed_checks = []
+    if http_fetcher.is_js_shell(ParsedPage(STATIC_PAGE, "")):
+        failed_checks.append("is_js_shell(static page) should be False")
+    if not http_fetcher.is_js_shell(ParsedPage(SHELL_PAGE, "")):
+        failed_checks.append("is_js_shell(shell page) should be True")
+    if http_fetcher.fetch(f"{fixture_url}static.html")[1] is None:
+        failed_checks.append("the static page should be served by the HTTP tier")
+    if http_fetcher.fetch(f"{fixture_url}shell.html")[1] is not None:
+        failed_checks.append("the shell page should fall back to the browser")
+    return failed_checks
+
+
+# Mean seconds to load and parse the static page over plain HTTP and in the browser (None if no browser can be started)
+def benchmark_http_fetcher(fixture_url, http_fetcher, repeats=10):
+    url = f"{fixture_url}static.html"
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        http_fetcher.fetch(url)[1].get_text()
+    http_seconds = (time.perf_counter() - start_time) / repeats
+
+    try:
+        web_scraper_obj = WebScraper()
+    except Exception as e:
+        print(f"Browser not available, Selenium path skipped: {e.__class__.__name__}")
+        return http_seconds, None
+    try:
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            web_scraper_obj.get_page_load_stats(url)
+            web_scraper_obj.set_html_innerHTML()
+            web_scraper_obj.get_body_text()
+        selenium_seconds = (time.perf_counter() - start_time) / repeats
+    finally:
+        web_scraper_obj.quit_driver()
+        web_scraper_obj.delete_profile_dir()
+    return http_seconds, selenium_seconds
+
+
+# python -m Utilities.benchmark_http_fetcher, exits with 1 if a check fails
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as fixture_dir:
+        write_fixture_pages(fixture_dir)
+        fixture_url, server = serve_fixture_site(fixture_dir)
+        http_fetcher = HttpFetcher()
+        try:
+            failed_checks = check_http_fetcher(fixture_url, http_fetcher)
+            for failed_check in failed_checks:
+                print(f"FAILED: {failed_check}")
+
+            http_seconds, selenium_seconds = benchmark_http_fetcher(fixture_url, http_fetcher)
+            print(f"HTTP tier: {http_seconds * 1000:.1f} ms per page")
+            if selenium_seconds is not None:
+                print(f"Selenium: {selenium_seconds * 1000:.1f} ms per page ({selenium_seconds / http_seconds:.0f}x slower)")
+        finally:
+            http_fetcher.close()
+            server.shutdown()
+
+    sys.exit(1 if failed_checks else 0)
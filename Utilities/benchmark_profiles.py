@@ -0,0 +1,103 @@
+import os
+import sys
+import zlib
+import struct
+import random
+import tempfile
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from Classes.Selenium import Selenium
+from Classes.WebScraper import WebScraper
+
+
+# Fixture page with what the text-only profile skips: images, a web font, autoplaying video and a little text.
+# Random asset bytes, so compression cannot hide the difference
+FIXTURE_PAGE = """<html><head><style>
+@font-face { font-family: "Fixture"; src: url("fixture.woff2") format("woff2"); }
+body { font-family: "Fixture", sans-serif; }
+</style></head><body>
+<h1>ACME Robotics</h1>
+<p>We build machine learning products for factories and computer vision inspection.</p>
+<img src="hero.png"><img src="product.png"><img src="team.png">
+<video src="intro.mp4" autoplay muted loop preload="auto"></video>
+<a href="products.html">Products</a>
+</body></html>"""
+
+
+# Valid PNG of random pixels
+def make_png(width, height, random_generator):
+    raw_rows = b"".join(b"\x00" + random_generator.randbytes(width * 3) for _ in range(height))
+
+    def chunk(chunk_type, data):
+        return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)) + chunk(b"IDAT", zlib.compress(raw_rows)) + chunk(b"IEND", b"")
+
+
+# Write the fixture page and its assets (about 0.4 MB) into directory
+def write_fixture_site(directory, seed=42):
+    random_generator = random.Random(seed)
+    fixture_files = {"index.html": FIXTURE_PAGE.encode("utf-8"), "fixture.woff2": random_generator.randbytes(40 * 1024),
+                     "intro.mp4": random_generator.randbytes(200 * 1024)}
+    for image_filename in ("hero.png", "product.png", "team.png"):
+        fixture_files[image_filename] = make_png(120, 120, random_generator)
+    for filename, content in fixture_files.items():
+        with open(os.path.join(directory, filename), "wb") as fixture_file:
+            fixture_file.write(content)
+
+
+# Load every URL with each browser profile and compare load time and bytes transferred (from the browser's timing API).
+# Every load starts with an empty HTTP cache, otherwise repeats would transfer almost nothing. Returns {profile: [stats per load]}
+def benchmark_browser_profiles(urls, profiles=Selenium.PROFILES, repeats=3):
+    results = {}
+    for browser_profile in profiles:
+        web_scraper_obj = WebScraper(browser_profile=browser_profile)
+        results[browser_profile] = []
+        try:
+            for url in urls:
+                for _ in range(repeats):
+                    try:
+                        web_scraper_obj.clear_browser_cache()
+                        results[browser_profile].append(web_scraper_obj.get_page_load_stats(url))
+                    except Exception as e:
+                        print(f"{browser_profile}: could not load {url}: {e.__class__.__name__}")
+        finally:
+            web_scraper_obj.quit_driver()
+            web_scraper_obj.delete_profile_dir()
+
+    for browser_profile, page_stats in results.items():
+        if not page_stats:
+            print(f"{browser_profile}: no page loaded")
+            continue
+        load_seconds = sum(stats["load_seconds"] or 0 for stats in page_stats) / len(page_stats)
+        transferred_kb = sum(stats["transferred_bytes"] for stats in page_stats) / len(page_stats) / 1024
+        resources = sum(stats["resources"] for stats in page_stats) / len(page_stats)
+        print(f"{browser_profile}: {len(page_stats)} loads, {load_seconds:.2f}s average load time, {transferred_kb:.0f} KB transferred, {resources:.0f} resources per page")
+    return results
+
+
+# Serve a local fixture site (a directory with an index.html) on a free port, returns its URL and the server
+def serve_fixture_site(directory):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(SimpleHTTPRequestHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/", server
+
+
+# python -m Utilities.benchmark_profiles [fixture directory or URL] ..., without arguments the bundled fixture page is used
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as fixture_dir:
+        targets = sys.argv[1:]
+        if not targets:
+            write_fixture_site(fixture_dir)
+            targets = [fixture_dir]
+
+        urls = []
+        for target in targets:
+            if os.path.isdir(target):
+                fixture_url, _ = serve_fixture_site(target)
+                urls.append(fixture_url)
+            else:
+                urls.append(target)
+
+        benchmark_browser_profiles(urls)
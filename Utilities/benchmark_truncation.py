@@ -0,0 +1,53 @@
+import sys
+import time
+import random
+from Classes.LinkWorker import LinkWorker
+
+WORDS = ["machine", "learning", "product", "Produkt", "Lösung", "computer", "vision", "inspection", "platform", "factory", "data", "the", "and", "für", "with", "AI", "2025", "€", "—"]
+
+
+# Roughly page_chars characters of page-like text (mixed English/German words, digits and multi-byte characters)
+def make_page(page_chars=200000, seed=1):
+    random_generator = random.Random(seed)
+    words = []
+    total_chars = 0
+    while total_chars < page_chars:
+        word = random_generator.choice(WORDS)
+        words.append(word)
+        total_chars += len(word) + 1
+    return " ".join(words)
+
+
+# The truncation scrape_page_content used before: drop 1,000 characters and re-count the whole page until it fits
+def truncate_by_characters(text, model_name, token_limit):
+    tokens = LinkWorker.count_tokens(text, model_name)
+    while tokens > token_limit:
+        text = text[:-1000]
+        tokens = LinkWorker.count_tokens(text, model_name)
+    return text
+
+
+# Mean seconds per page of the old character loop and of LinkWorker.truncate_to_tokens
+def benchmark_truncation(page_chars=200000, model_name="gpt-4o", token_limit=LinkWorker.DEFAULT_PAGE_TOKEN_LIMIT, repeats=3):
+    page = make_page(page_chars)
+    LinkWorker.count_tokens("warm up the encoder", model_name)
+
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        old_text = truncate_by_characters(page, model_name, token_limit)
+    loop_seconds = (time.perf_counter() - start_time) / repeats
+
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        new_text, _ = LinkWorker.truncate_to_tokens(page, model_name, token_limit)
+    single_encode_seconds = (time.perf_counter() - start_time) / repeats
+
+    print(f"{len(page)} characters, {LinkWorker.count_tokens(page, model_name)} tokens, limit {token_limit}")
+    print(f"1,000-character loop: {loop_seconds * 1000:.1f} ms per page, {LinkWorker.count_tokens(old_text, model_name)} tokens kept")
+    print(f"Single encode: {single_encode_seconds * 1000:.1f} ms per page, {LinkWorker.count_tokens(new_text, model_name)} tokens kept ({loop_seconds / single_encode_seconds:.0f}x faster)")
+    return loop_seconds, single_encode_seconds
+
+
+# python -m Utilities.benchmark_truncation [page characters]
+if __name__ == "__main__":
+    benchmark_truncation(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
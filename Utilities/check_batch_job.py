@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from openai import OpenAI
+
+STAND_IN_ANSWER = '{"is_ai_company": "Yes"}'
+
+
+# Stand-in for the OpenAI files, batches and chat completions endpoints. A batch is in progress on the first poll and
+# ends with final_status on the next one. Requests in failed_ids fail inside the batch, requests in missing_ids are
+# left out of the output (not done before the batch expired or was cancelled). Chat completions (the synchronous
+# fallback) always answer STAND_IN_ANSWER
+class BatchStandIn():
+    def __init__(self, final_status="completed", failed_ids=(), missing_ids=()):
+        self.reset(final_status, failed_ids, missing_ids)
+
+    def reset(self, final_status="completed", failed_ids=(), missing_ids=()):
+        self.final_status = final_status
+        self.failed_ids = set(failed_ids)
+        self.missing_ids = set(missing_ids)
+        self.files = {}
+        self.batches = {}
+        self.polls = {}
+        self.chat_requests = []
+
+    def create_file(self, content):
+        file_id = f"file-{len(self.files) + 1}"
+        self.files[file_id] = content
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()), "filename": "batch.jsonl", "purpose": "batch", "status": "processed"}
+
+    def create_batch(self, body):
+        batch_id = f"batch-{len(self.batches) + 1}"
+        self.batches[batch_id] = {"id": batch_id, "object": "batch", "endpoint": body["endpoint"], "input_file_id": body["input_file_id"],
+                                  "completion_window": body["completion_window"], "status": "validating", "created_at": int(time.time())}
+        self.polls[batch_id] = 0
+        return self.batches[batch_id]
+
+    def retrieve_batch(self, batch_id):
+        batch = self.batches[batch_id]
+        self.polls[batch_id] += 1
+        requests = [json.loads(line) for line in self.files[batch["input_file_id"]].splitlines() if line.strip()]
+        if self.polls[batch_id] == 1:
+            batch["status"] = "in_progress"
+            batch["request_counts"] = {"total": len(requests), "completed": 0, "failed": 0}
+            return batch
+
+        batch["status"] = self.final_status
+        if self.final_status == "failed":
+            return batch
+
+        output_lines = []
+        for request in requests:
+            custom_id = request["custom_id"]
+            if custom_id in self.missing_ids:
+                continue
+            if custom_id in self.failed_ids:
+                response = {"status_code": 500, "body": {"error": {"message": "stand-in failure"}}}
+            else:
+                response = {"status_code": 200, "body": self.make_completion(request["body"]["model"])}
+            output_lines.append(json.dumps({"custom_id": custom_id, "response": response, "error": None}))
+        batch["output_file_id"] = self.create_file("\n".join(output_lines) + "\n")["id"]
+        batch["request_counts"] = {"total": len(requests), "completed": len(output_lines) - len(self.failed_ids), "failed": len(self.failed_ids)}
+        return batch
+
+    @staticmethod
+    def make_completion(model_name):
+        return {"id": "chatcmpl-stand-in", "object": "chat.completion", "created": int(time.time()), "model": model_name,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": STAND_IN_ANSWER}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110}}
+
+    # Serve on a free port, returns the base URL for the OpenAI client and the server
+    def serve(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, data):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path.startswith("/v1/files/") and path.endswith("/content"):
+                    body = stand_in.files[path.split("/")[3]].encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                elif path.startswith("/v1/batches/"):
+                    self.send_json(stand_in.retrieve_batch(path.split("/")[3]))
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path == "/v1/files":
+                    # The JSONL lines of the multipart upload
+                    lines = [line for line in body.decode("utf-8").splitlines() if line.startswith('{"custom_id"')]
+                    self.send_json(stand_in.create_file("\n".join(lines) + "\n"))
+                elif self.path == "/v1/batches":
+                    self.send_json(stand_in.create_batch(json.loads(body)))
+                elif self.path == "/v1/chat/completions":
+                    request = json.loads(body)
+                    stand_in.chat_requests.append(request)
+                    self.send_json(stand_in.make_completion(request["model"]))
+                else:
+                    self.send_error(404)
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{server.server_address[1]}/v1", server
+
+
+# Submit three AI checks to a stand-in batch ending with final_status, merge its results and answer the rest through the
+# synchronous fallback of write_batch_rows. Returns the failed checks
+def check_batch_job(stand_in, base_url, final_status, failed_ids=(), missing_ids=()):
+    stand_in.reset(final_status, failed_ids, missing_ids)
+    failed_checks = []
+    with tempfile.TemporaryDirectory() as job_dir:
+        job_filename = os.path.join(job_dir, "batch_job.jsonl")
+        batch_job = BatchJob(job_filename, client=OpenAI(api_key="stand-in", base_url=base_url), poll_interval_seconds=0)
+        batch_keys = ["A|https://a.example/", "B|https://b.example/", "C|https://c.example/"]
+        for batch_key in batch_keys:
+            batch_job.add(batch_key, "o3", f"Is {batch_key} an AI company?", ChatGPT.make_structured_params("o3", AI_Classification_Structure))
+
+        batch_answers = batch_job.run()
+        # Nothing of a failed batch is merged, every request falls back
+        lost_ids = set(batch_keys) if final_status == "failed" else stand_in.failed_ids | stand_in.missing_ids
+        expected_keys = [batch_key for batch_key in batch_keys if batch_key not in lost_ids]
+        if sorted(batch_answers) != expected_keys:
+            failed_checks.append(f"{final_status}: merged {sorted(batch_answers)}, expected {expected_keys}")
+        if os.path.exists(os.path.join(job_dir, "batch_job.batch_id")):
+            failed_checks.append(f"{final_status}: the batch id should be removed once the batch is done")
+
+        cost_ledger = CostLedger(MODEL_PRICES_FILE)
+        for batch_key in batch_keys:
+            answer = get_batch_ai_answer(batch_answers, batch_key, "o3", "ACME builds machine learning products.", cost_ledger)[0]
+            if answer != "Yes":
+                failed_checks.append(f"{final_status}: {batch_key} answered {answer}")
+
+        fallback_count = len(batch_keys) - len(expected_keys)
+        if len(stand_in.chat_requests) != fallback_count:
+            failed_checks.append(f"{final_status}: {len(stand_in.chat_requests)} synchronous fallback calls, expected {fallback_count}")
+
+        # A re-run with the same requests submits a new batch instead of resuming the finished one
+        rerun_batch_job = BatchJob(job_filename, client=OpenAI(api_key="stand-in", base_url=base_url), poll_interval_seconds=0)
+        for batch_key in batch_keys:
+            rerun_batch_job.add(batch_key, "o3", f"Is {batch_key} an AI company?", ChatGPT.make_structured_params("o3", AI_Classification_Structure))
+        rerun_batch_job.run()
+        if len(stand_in.batches) != 2:
+            failed_checks.append(f"{final_status}: the re-run should submit a new batch, {len(stand_in.batches)} batches submitted")
+    return failed_checks
+
+
+# python -m Utilities.check_batch_job, exits with 1 if a check fails
+if __name__ == "__main__":
+    stand_in = BatchStandIn()
+    base_url, server = stand_in.serve()
+    # The synchronous fallback uses the shared client, so it must point at the stand-in before app creates it
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("MY_KEY", "stand-in")
+    from app import BatchJob, CostLedger, AI_Classification_Structure, ChatGPT, get_batch_ai_answer, MODEL_PRICES_FILE
+
+    failed_checks = []
+    try:
+        failed_checks += check_batch_job(stand_in, base_url, "completed", failed_ids=["B|https://b.example/"])
+        failed_checks += check_batch_job(stand_in, base_url, "expired", missing_ids=["C|https://c.example/"])
+        failed_checks += check_batch_job(stand_in, base_url, "cancelled", failed_ids=["A|https://a.example/"], missing_ids=["C|https://c.example/"])
+        failed_checks += check_batch_job(stand_in, base_url, "failed")
+    finally:
+        server.shutdown()
+    for failed_check in failed_checks:
+        print(f"FAILED: {failed_check}")
+    print(f"{len(failed_checks)} checks failed")
+
+    sys.exit(1 if failed_checks else 0)
@@ -0,0 +1,80 @@
+import sys
+import time
+from Classes.LinkRanker import LinkRanker
+from Classes.LinkWorker import LinkWorker
+from Classes.PageCache import PageCache
+from Classes.ParsedPage import ParsedPage
+from Classes.RunManifest import RunManifest
+
+
+# Compare the link ranker with the links the LLM picked in earlier runs, offline: the LLM's picks come from the "links"
+# checkpoints of the run manifest and the homepages from the page cache, so no browser or LLM call is needed.
+# Returns {startup_key: {"llm": [...], "ranker": [...], "precision": ..., "recall": ..., "selection_us": ...}}
+def evaluate_link_ranker(manifest_filename, page_cache_filename, limit=6):
+    run_manifest = RunManifest(manifest_filename, resume=True)
+    page_cache = PageCache(page_cache_filename, max_age_seconds=float("inf"))
+    link_ranker = LinkRanker()
+    results = {}
+    try:
+        for startup_key, data in run_manifest.get_stage_entries("links"):
+            if data.get("link_selection", "llm") != "llm":
+                continue
+
+            # Startup names may contain "|", URLs do not
+            url = LinkWorker.clean_url(startup_key.rsplit("|", 1)[1])
+            snapshot = page_cache.get(url)
+            if snapshot is None:
+                print(f"{startup_key}: homepage not in the page cache, skipped")
+                continue
+
+            # Links are resolved against the URL after redirects, like the scraper does
+            final_url = snapshot["final_url"]
+            parsed_page = ParsedPage(snapshot["body_html"], snapshot["iframe_text"])
+            page_links = parsed_page.get_links(final_url, LinkWorker.filter_page_links)
+            anchors = parsed_page.get_anchors()
+
+            start_time = time.perf_counter()
+            ranker_links = link_ranker.rank(final_url, page_links, anchors, limit)
+            selection_us = (time.perf_counter() - start_time) * 1000000
+
+            llm_links = data["links"][1:]  # The homepage is always first
+            overlap = len(set(ranker_links) & set(llm_links))
+            results[startup_key] = {
+                "llm": llm_links,
+                "ranker": ranker_links,
+                "precision": overlap / len(ranker_links) if ranker_links else None,
+                "recall": overlap / len(llm_links) if llm_links else None,
+                "selection_us": selection_us,
+            }
+    finally:
+        run_manifest.close()
+        page_cache.close()
+
+    for startup_key, result in results.items():
+        print(f"{startup_key}: {len(set(result['ranker']) & set(result['llm']))} of {len(result['llm'])} LLM links picked by the ranker")
+        for link in result["llm"]:
+            if link not in result["ranker"]:
+                print(f"    missed: {link}")
+        for link in result["ranker"]:
+            if link not in result["llm"]:
+                print(f"    extra:  {link}")
+
+    if not results:
+        print("No LLM link selections to compare with")
+        return results
+
+    precisions = [result["precision"] for result in results.values() if result["precision"] is not None]
+    recalls = [result["recall"] for result in results.values() if result["recall"] is not None]
+    selection_us = sum(result["selection_us"] for result in results.values()) / len(results)
+    print(f"{len(results)} startups compared")
+    print(f"Mean precision: {sum(precisions) / len(precisions):.2f}" if precisions else "Mean precision: n/a")
+    print(f"Mean recall: {sum(recalls) / len(recalls):.2f}" if recalls else "Mean recall: n/a")
+    print(f"Mean ranker selection time: {selection_us:.0f} µs per startup")
+    return results
+
+
+# python -m Utilities.evaluate_link_ranker [run manifest] [page cache]
+if __name__ == "__main__":
+    manifest_filename = sys.argv[1] if len(sys.argv) > 1 else "run_manifest.sqlite"
+    page_cache_filename = sys.argv[2] if len(sys.argv) > 2 else "page_cache.sqlite"
+    evaluate_link_ranker(manifest_filename, page_cache_filename)
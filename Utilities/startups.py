@@ -0,0 +1,92 @@
+import csv
+import os
+from typing import NamedTuple, Optional
+import openpyxl
+import pandas as pd
+
+
+# One input row. url is taken from a URL column or derived from the email domain
+class StartupRow(NamedTuple):
+    row: int
+    name: Optional[str]
+    url: Optional[str]
+    description: Optional[str]
+
+
+# Outcome of processing one startup, as written to the results sheet
+class StartupResult(NamedTuple):
+    url: Optional[str]
+    full_description: str
+    answer: Optional[str]
+    token_cost: float = 0
+    saved_token_cost: float = 0
+    llm_calls: int = 0
+
+
+def get_domain_from_email(email):
+    if pd.isnull(email):
+        return None
+    try:
+        return f"https://{email.split('@')[1]}"
+    except:
+        return None
+
+
+# Columns can be given by header name or by 1-based index
+def find_column(headers, column):
+    if column is None or isinstance(column, int):
+        return column
+
+    for index, header in enumerate(headers, start=1):
+        if header == column:
+            return index
+    raise ValueError(f"{column} column not found in the input file")
+
+
+# Stream StartupRow records from an .xlsx (openpyxl read-only mode) or .csv file, without loading or modifying the whole sheet.
+# Headers are checked right away, rows are only read while the returned generator is consumed.
+def iter_startup_rows(filename, sheet_name=None, name_col=1, email_col=None, url_col=None, description_col=None, start_index=2, stop_index=None):
+    if os.path.splitext(filename)[1].lower() == ".csv":
+        input_file = open(filename, "r", encoding="utf-8-sig", newline="")
+        rows = csv.reader(input_file)
+        close_input = input_file.close
+    else:
+        input_wb = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+        input_sheet = input_wb[sheet_name] if sheet_name else input_wb.active
+        rows = input_sheet.iter_rows(values_only=True)
+        close_input = input_wb.close
+
+    try:
+        headers = next(rows, [])
+        columns = [find_column(headers, column) for column in (name_col, email_col, url_col, description_col)]
+    except Exception:
+        close_input()
+        raise
+
+    return generate_startup_rows(rows, close_input, columns, start_index, stop_index)
+
+
+def generate_startup_rows(rows, close_input, columns, start_index, stop_index):
+    name_index, email_index, url_index, description_index = columns
+
+    def cell(values, index):
+        if index is None or index > len(values):
+            return None
+        value = values[index - 1]
+        # CSV cells are always strings, treat empty ones like empty Excel cells
+        return None if value == "" else value
+
+    try:
+        for row, values in enumerate(rows, start=2):
+            if row < start_index:
+                continue
+            if stop_index is not None and row > stop_index:
+                break
+
+            url = cell(values, url_index)
+            if url is None and email_index is not None:
+                url = get_domain_from_email(cell(values, email_index))
+
+            yield StartupRow(row, cell(values, name_index), url, cell(values, description_index))
+    finally:
+        close_input()
@@ -1,75 +1,186 @@
 # Standard Library
+import io
 import os
 import re
+import queue
+import threading
+from functools import lru_cache
+from urllib.parse import urlparse
 
 # Third-Party Library
 import pandas as pd
 from dotenv import load_dotenv
-from openai import OpenAI
-import anthropic
+from flask import Flask, Response, jsonify, render_template, request, send_file, stream_with_context
+from flask_wtf import FlaskForm
+from werkzeug.utils import secure_filename
 
 # Local Imports
 from Classes import ChatGPT, Prompts, WebScraper, TextExtractor
+from Classes.ChatGPT import Important_Links_Structure, AI_Classification_Structure
+from Classes.LLMGateway import LLMGateway
+from Classes.ResponseCache import ResponseCache
+from Classes.PageCache import PageCache
+from Classes.HttpFetcher import HttpFetcher
+from Classes.ResultSink import ResultSink
+from Classes.RunManifest import RunManifest
+from Classes.ContentFingerprints import ContentFingerprints
+from Classes.BoilerplateStripper import BoilerplateStripper
+from Classes.JobQueue import JobQueue
+from Classes.BatchJob import BatchJob
+from Classes.RateLimiter import RateLimiter
+from Classes.RunMetrics import RunMetrics
+from Classes.CostLedger import CostLedger
+from Classes.BrowserPool import BrowserPool
+from Classes.Selenium import Selenium
+from Classes.LinkRanker import LinkRanker
+from Utilities.startups import iter_startup_rows, StartupResult
+from Classes.LinkWorker import LinkWorker
 from Utilities import *
 
 # Load environment variables
 load_dotenv()
 
+# Web UI, the pipeline itself runs in worker.py processes
+app = Flask(__name__)
+
 # Constants
 TOTAL_PAGE_CRAWLS = 7
+MODEL_NAME = "chatgpt-4o-latest"
+CONTENT_SHORTENER_MODEL = "chatgpt-4o-latest"
+REASONING_MODEL = "o3"
+LLM_CACHE_FILE = "llm_response_cache.sqlite"
+LLM_CACHE_TTL_SECONDS = 90 * 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 200000
+PAGE_CACHE_FILE = "page_cache.sqlite"
+PAGE_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600
+RESULTS_EXPORT_INTERVAL_SECONDS = 600
+RUN_MANIFEST_FILE = "run_manifest.sqlite"
+RUN_REPORT_FILE = "run_report.json"
+# Fingerprints of the pages and startups of earlier runs, unchanged ones are not sent to the LLMs again
+CONTENT_FINGERPRINTS_FILE = "content_fingerprints.sqlite"
+# How the pages to crawl are picked from the homepage links: "ranker" (local keyword scoring, no LLM call),
+# "prefilter" (the ranker shortlists LINK_PREFILTER_LIMIT links, the LLM picks from them) or "llm" (the LLM sees all links)
+LINK_SELECTION_MODES = ["ranker", "prefilter", "llm"]
+LINK_PREFILTER_LIMIT = 20
+# Input, cached input and output prices per model
+MODEL_PRICES_FILE = "model_prices.json"
+# Email domains of webmail providers say nothing about the startup, rows with these are skipped
+FREE_MAIL_DOMAINS = {"gmail.com", "googlemail.com", "outlook.com", "outlook.de", "hotmail.com", "hotmail.de", "live.com", "live.de", "msn.com", "yahoo.com", "yahoo.de", "icloud.com", "me.com", "mac.com", "aol.com", "gmx.de", "gmx.net", "gmx.at", "gmx.ch", "web.de", "t-online.de", "freenet.de", "posteo.de", "mailbox.org", "protonmail.com", "proton.me", "arcor.de", "online.de", "yandex.com", "mail.ru", "zoho.com", "fastmail.com"}
+# Optional extra blocked domains, one per line
+BLOCKED_DOMAINS_FILE = "blocked_domains.txt"
+BATCH_JOB_FILE = "check_ai_batch.jsonl"
+BATCH_POLL_INTERVAL_SECONDS = 60
+# (requests per minute, tokens per minute) of our OpenAI account tier, shared by all workers
+LLM_RATE_LIMITS = {
+    "chatgpt-4o-latest": (500, 800000),
+    "gpt-4o": (5000, 800000),
+    "gpt-4o-mini": (5000, 4000000),
+    "o3": (500, 500000),
+    "o3-mini": (5000, 4000000),
+}
+# Web UI jobs: name of the result file and parallel browser workers per job
+WEB_RESULT_FILENAME = "PNP Results_output.xlsx"
+WEB_JOB_WORKERS = 2
+# An SSE comment is sent this often while a job has no new log line, so proxies keep the stream open
+SSE_KEEP_ALIVE_SECONDS = 15
 
 
 
 def content_shortener(content_shortener_model, prompts_obj, page_content):
-    chat_shorten_page_obj = ChatGPT(content_shortener_model, prompts_obj.shorten_page_content(page_content), [], OpenAI(api_key=os.getenv("MY_KEY"), max_retries=5))
+    chat_shorten_page_obj = ChatGPT(content_shortener_model, prompts_obj.shorten_page_content(page_content), [])
     chat_shorten_page_response, input_tokens, output_tokens = chat_shorten_page_obj.chat_model()
     # print(f"Shortened Page Content: {chat_shorten_page_response}")
 
     return chat_shorten_page_response, input_tokens, output_tokens
 
 
-# Get the content of all the pages and return a list
-def get_pages_contents(web_scraper_obj, links, model_name, content_shortener_model, prompts_obj) -> list:
+# Queue the shortening call on the LLM gateway. Returns the chat object and a future for its [answer, input_tokens, output_tokens]
+def content_shortener_async(content_shortener_model, prompts_obj, page_content):
+    chat_shorten_page_obj = ChatGPT(content_shortener_model, prompts_obj.shorten_page_content(page_content), [])
+    return chat_shorten_page_obj, LLMGateway.submit(chat_shorten_page_obj.async_chat_model())
+
+
+# Get the content of all the pages, returns the list and the fingerprint of the startup (over all page texts, None without any page).
+# With content_fingerprints, pages near-identical to the last crawl reuse their shortened content instead of calling the LLM
+def get_pages_contents(web_scraper_obj, startup_costs, links, model_name, content_shortener_model, prompts_obj, content_fingerprints=None):
     pages_content = []
     
     if links is None:
-        return ["Page Error - No Link Found"] * TOTAL_PAGE_CRAWLS
+        return ["Page Error - No Link Found"] * TOTAL_PAGE_CRAWLS, None
+
+    # Shortening runs on the LLM gateway while the browser moves on to the next link.
+    # Pending pages keep a placeholder in pages_content until their answer is collected.
+    pending_shortenings = {}
+    # Texts of the loaded pages and (link, fingerprint) of the pending pages, by index
+    page_texts = []
+    page_fingerprints = {}
+    # Nav, footer and other text repeated across the site's pages is only sent with the first page it appears on
+    boilerplate_stripper = BoilerplateStripper()
 
     # Traverse the important links
-    for link in links:
+    for link in links[:TOTAL_PAGE_CRAWLS]:
         try:
             web_scraper_obj.set_url(link)
             web_scraper_obj.load_page()
             
             # Check if page was loaded successfully
-            if web_scraper_obj.get_body_text() == "Page Error - HTML Element not found" or web_scraper_obj.get_body_text() == "Page Error - Unexpected Error":
+            body_text = web_scraper_obj.get_body_text()
+            if body_text == "Page Error - HTML Element not found" or body_text == "Page Error - Unexpected Error":
                 print(f"Error accessing {link}: Page could not be loaded")
                 pages_content.append("Page Error - Could not access page")
                 continue
                 
-            page_content = web_scraper_obj.get_page_content(model_name)
+            page_content = web_scraper_obj.get_page_content(model_name, boilerplate_stripper)
+            page_texts.append(page_content)
 
-            # Shorten the content
-            shortened_content, input_tokens, output_tokens = content_shortener(content_shortener_model, prompts_obj, page_content)
-            # Update token cost
-            web_scraper_obj.set_token_cost(input_tokens, output_tokens, content_shortener_model)
+            if not page_content.strip():
+                print(f"No new content on {link} after removing boilerplate")
+                pages_content.append("No relevant content found")
+                continue
 
-            pages_content.append(shortened_content)
+            if content_fingerprints is not None:
+                page_fingerprint = ContentFingerprints.make_fingerprint([page_content])
+                shortened_content = content_fingerprints.get_page(link, page_fingerprint, content_shortener_model, Prompts.VERSION)
+                if shortened_content is not None:
+                    print(f"{link} unchanged since the last crawl, reusing its shortened content")
+                    pages_content.append(shortened_content)
+                    continue
+                page_fingerprints[len(pages_content)] = (link, page_fingerprint)
+
+            # Shorten the content in the background
+            pending_shortenings[len(pages_content)] = content_shortener_async(content_shortener_model, prompts_obj, page_content)
+            pages_content.append(None)
         except Exception as e:
             print(f"Error accessing {link}: {str(e)}")
             pages_content.append("Page Error - Could not access page")
 
+    print(f"Boilerplate removed from {boilerplate_stripper.get_stripped_pages()} pages, {boilerplate_stripper.get_saved_tokens()} input tokens saved")
+    startup_costs.record_boilerplate_tokens(boilerplate_stripper.get_saved_tokens())
+
+    # Collect the shortened pages in their original order
+    for index, (chat_shorten_page_obj, shortened_future) in pending_shortenings.items():
+        try:
+            shortened_content, input_tokens, output_tokens = shortened_future.result()
+            # Update token cost
+            startup_costs.record("shorten", content_shortener_model, input_tokens, output_tokens, chat_shorten_page_obj.get_cached_input_tokens(), chat_shorten_page_obj.is_cached())
+            pages_content[index] = shortened_content
+            if index in page_fingerprints and shortened_content is not None:
+                content_fingerprints.put_page(*page_fingerprints[index], shortened_content, content_shortener_model, Prompts.VERSION)
+        except Exception as e:
+            print(f"Error shortening page {index + 1}: {str(e)}")
+            pages_content[index] = "Page Error - Could not access page"
+
     # Ensure we always return TOTAL_PAGE_CRAWLS number of items
     if len(pages_content) < TOTAL_PAGE_CRAWLS:
         pages_content.extend(["Page Error - No additional pages found"] * (TOTAL_PAGE_CRAWLS - len(pages_content)))
     elif len(pages_content) > TOTAL_PAGE_CRAWLS:
         pages_content = pages_content[:TOTAL_PAGE_CRAWLS]
 
-    return pages_content
+    return pages_content, ContentFingerprints.make_fingerprint(page_texts)
 
 
 # Get the full description of the startup using the list of page contents
-def get_full_description(web_scraper_obj, pages_content, model_name, prompts_obj):
+def get_full_description(startup_costs, pages_content, model_name, prompts_obj):
     try:
         # Check if all pages had errors
         if all("Page Error" in content for content in pages_content):
@@ -77,11 +188,11 @@ def get_full_description(web_scraper_obj, pages_content, model_name, prompts_obj
 
         pages_content_string = "\n\n\n\n".join(pages_content)
 
-        chat_description_obj = ChatGPT(model_name, prompts_obj.startup_summary(pages_content_string), [], OpenAI(api_key=os.getenv("MY_KEY"), max_retries=5))
+        chat_description_obj = ChatGPT(model_name, prompts_obj.startup_summary(pages_content_string), [])
         chat_description_response, input_tokens, output_tokens = chat_description_obj.chat_model()
         
         # Update token cost
-        web_scraper_obj.set_token_cost(input_tokens, output_tokens, model_name)
+        startup_costs.record("description", model_name, input_tokens, output_tokens, chat_description_obj.get_cached_input_tokens(), chat_description_obj.is_cached())
         
         return chat_description_response
 
@@ -93,11 +204,8 @@ def get_full_description(web_scraper_obj, pages_content, model_name, prompts_obj
 
 
 
-def save_to_excel(output_sheet, output_wb, startup_name, cleaned_url, redirected_url, web_scraper_obj, all_links, all_pages_content, full_description, all_details_dict, output_filename):
+def save_to_excel(result_sink, startup_name, cleaned_url, redirected_url, token_cost, all_links, all_pages_content, full_description, all_details_dict):
     headers = ["Startup Name", "Homepage URL", "Redirected URL (for logging only)", "Additional URLs"] + [f"Page {i+1}" for i in range(TOTAL_PAGE_CRAWLS)] + ["Full Description" ,"Short Description", "Focus Type", "Industry", "Revenue Models (Top 3)" ,"Total Token Cost ($)"]
-    # Write headers if not present
-    if output_sheet.max_row < 2:
-        output_sheet.append(headers)
 
     # When all_links is None
     urls_string = ", ".join(all_links) if all_links is not None else ""
@@ -106,16 +214,14 @@ def save_to_excel(output_sheet, output_wb, startup_name, cleaned_url, redirected
     all_pages_content_padded = all_pages_content[:TOTAL_PAGE_CRAWLS] + [""] * (TOTAL_PAGE_CRAWLS - len(all_pages_content))
 
     # Write data
-    row = [startup_name, cleaned_url, redirected_url, urls_string] + all_pages_content_padded[:TOTAL_PAGE_CRAWLS] + [full_description, all_details_dict['short_description'],all_details_dict['focus_type'], all_details_dict['industry'], all_details_dict['revenue_model'], web_scraper_obj.get_token_cost()]
+    row = [startup_name, cleaned_url, redirected_url, urls_string] + all_pages_content_padded[:TOTAL_PAGE_CRAWLS] + [full_description, all_details_dict['short_description'],all_details_dict['focus_type'], all_details_dict['industry'], all_details_dict['revenue_model'], token_cost]
 
-    output_sheet.append(row)
-    output_wb.save(f"{output_filename}")  
+    # Headers are written by the sink before the first row
+    result_sink.write_row(row, headers)
 
 
 def claude_api(prompt):
-    client = anthropic.Anthropic(
-        api_key=os.getenv("ANTHROPIC_KEY")
-    )
+    client = LLMGateway.get_anthropic_client()
     message = client.messages.create(
         model="claude-3-7-sonnet-20250219",
         max_tokens=8192,
@@ -130,211 +236,580 @@ def claude_api(prompt):
     return message_content, input_tokens, output_tokens
 
 
-def get_relavant_links(web_scraper_obj, page_links, model_name, prompts_obj):
-    chat_links_obj = ChatGPT(model_name, prompts_obj.get_important_links(page_links), [], OpenAI(api_key=os.getenv("MY_KEY"), max_retries=5))
+# With Structured Outputs the answer is constrained to Important_Links_Structure, so it parses on the first try.
+# Other models answer the list as plain text
+def get_relavant_links(startup_costs, page_links, model_name, prompts_obj):
+    chat_links_obj = ChatGPT(model_name, prompts_obj.get_important_links(page_links), [], response_format=Important_Links_Structure)
     chat_links_response, input_tokens, output_tokens = chat_links_obj.chat_model()
-    chat_links_response = extract_list(chat_links_response)
+    if chat_links_response is None:
+        return []
     # Update token cost
-    web_scraper_obj.set_token_cost(input_tokens, output_tokens, model_name)
+    startup_costs.record("links", model_name, input_tokens, output_tokens, chat_links_obj.get_cached_input_tokens(), chat_links_obj.is_cached())
 
-    return chat_links_response
+    if not chat_links_obj.uses_structured_output():
+        return extract_list(chat_links_response)
+    important_links = chat_links_obj.parse_answer(chat_links_response)
+    return important_links.links if important_links is not None else []
 
 
+# Yes or No of an AI check answer of model_name, None if it could not be parsed.
+# Models without Structured Outputs answer plain text, which is kept as is unless it is a bare Yes or No
+def get_ai_classification(chat_ai_response, model_name):
+    if chat_ai_response is None:
+        return None
+    if not ChatGPT.supports_structured_output(model_name):
+        answer = chat_ai_response.strip().strip(".'\"").capitalize()
+        return answer if answer in ["Yes", "No"] else chat_ai_response
 
-def prompt_approach(model_name, content_shortener_model, reasoning_model, sheet, output_sheet, output_wb, output_filename, startup_name_col, start_index, stop_index):
-    # Initialize the objects
-    web_scraper_obj = WebScraper()
-    prompts_obj = Prompts(TOTAL_PAGE_CRAWLS)
+    ai_classification = ChatGPT.parse_structured_answer(AI_Classification_Structure, chat_ai_response)
+    return ai_classification.is_ai_company if ai_classification is not None else None
 
-    # Process rows from start_index to stop_index
-    for main_loop_index, row in enumerate(range(start_index, stop_index + 1), start=1):
-        startup_name = sheet.cell(row=row, column=startup_name_col).value
-        url = sheet.cell(row=row, column=4).value
-        
-        if pd.isnull(url):
-            continue
 
-        print(f"Row {row}: {startup_name}")
 
-        try:
-            # First set the URL (this cleans the URL), then get the cleaned URL
-            web_scraper_obj.set_url(url)
-            cleaned_url = web_scraper_obj.get_url()
-
-            # Load page and check if it's accessible
-            if not web_scraper_obj.load_page():
-                print(f"Website not accessible for {startup_name}")
-                save_to_excel_check(output_sheet, output_wb, startup_name, cleaned_url, 
-                                  "Page Error - Website not accessible", "No", web_scraper_obj, output_filename)
-                continue
+# Load the homepage and select the important links. Returns (final_url, links) or (cleaned_url, None) if the site is not accessible
+def select_startup_links(web_scraper_obj, startup_costs, prompts_obj, startup_name, url, model_name, link_selection="ranker"):
+    # First set the URL (this cleans the URL), then get the cleaned URL
+    web_scraper_obj.set_url(url)
+    cleaned_url = web_scraper_obj.get_url()
 
-            # Get redirected startup url (this will be for homepage)
-            redirected_url = web_scraper_obj.get_redirected_url()
-            
-            # Use redirected URL if available, otherwise use cleaned URL
-            final_url = redirected_url if redirected_url else cleaned_url
-
-            # Get the content and links
-            # page_content = web_scraper_obj.get_page_content(model_name)
-            page_links = web_scraper_obj.get_page_links()
-
-            # Use chat-gpt model to get relevant links with retry logic
-            chat_links_response = get_relavant_links(web_scraper_obj, page_links, model_name, prompts_obj)
-            retry_count = 0
-            while not chat_links_response and retry_count < 10:  # Try up to 10 times
-                print(f"No relevant links found. Retry attempt {retry_count + 1}")
-                chat_links_response = get_relavant_links(web_scraper_obj, page_links, model_name, prompts_obj)
-                retry_count += 1
-
-            if not chat_links_response:
-                print(f"No additional relevant links found for {startup_name} after {retry_count} attempts, proceeding with homepage only")
-                chat_links_response = [web_scraper_obj.get_url()]  # Just use the homepage
-            else:
-                chat_links_response.insert(0, web_scraper_obj.get_url())
-                print(f"All Important Links: {chat_links_response}")
-            
-            # Get the content of all the pages
-            all_pages_content = get_pages_contents(web_scraper_obj, chat_links_response, model_name, content_shortener_model, prompts_obj)
+    # Load page and check if it's accessible
+    if not web_scraper_obj.load_page():
+        print(f"Website not accessible for {startup_name}")
+        return cleaned_url, None
+
+    # Get redirected startup url (this will be for homepage)
+    redirected_url = web_scraper_obj.get_redirected_url()
+    
+    # Use redirected URL if available, otherwise use cleaned URL
+    final_url = redirected_url if redirected_url else cleaned_url
 
+    # Get the content and links
+    # page_content = web_scraper_obj.get_page_content(model_name)
+    page_links = web_scraper_obj.get_page_links()
+
+    if link_selection == "ranker":
+        with RunMetrics.span("link_ranking"):
+            chat_links_response = LinkRanker().rank(web_scraper_obj.get_url(), page_links, web_scraper_obj.get_page_anchors(), TOTAL_PAGE_CRAWLS - 1)
+        print(f"All Important Links: {[web_scraper_obj.get_url()] + chat_links_response}")
+        return final_url, [web_scraper_obj.get_url()] + chat_links_response
+
+    if link_selection == "prefilter":
+        with RunMetrics.span("link_ranking"):
+            page_links = LinkRanker().rank(web_scraper_obj.get_url(), page_links, web_scraper_obj.get_page_anchors(), LINK_PREFILTER_LIMIT, include_neutral=True)
+
+    # Use chat-gpt model to get relevant links. An empty list is a valid answer, so it is not retried
+    chat_links_response = get_relavant_links(startup_costs, page_links, model_name, prompts_obj)
+
+    if not chat_links_response:
+        print(f"No additional relevant links found for {startup_name}, proceeding with homepage only")
+        chat_links_response = [web_scraper_obj.get_url()]  # Just use the homepage
+    else:
+        chat_links_response.insert(0, web_scraper_obj.get_url())
+        print(f"All Important Links: {chat_links_response}")
+
+    return final_url, chat_links_response
+
+
+# With a run_manifest, every finished stage is checkpointed and a startup resumes from its last finished stage
+# With a batch_job, the AI check is only queued and the result's answer is None until the batch is merged (see write_batch_rows)
+# With content_fingerprints, a startup whose pages are near-identical to the last run reuses its description and AI verdict
+def process_startup(web_scraper_obj, prompts_obj, startup_name, url, model_name, content_shortener_model, reasoning_model, cost_ledger, run_manifest=None, batch_job=None, link_selection="ranker", content_fingerprints=None):
+    startup_key = RunManifest.make_key(startup_name, url)
+    startup_costs = cost_ledger.get_startup(startup_key)
+    checkpoints = run_manifest.get_stages(startup_key) if run_manifest is not None else {}
+
+    def checkpoint(stage, **data):
+        if run_manifest is not None:
+            data.update(token_cost=startup_costs.get_token_cost(), saved_token_cost=startup_costs.get_saved_token_cost())
+            run_manifest.set_stage(startup_key, stage, data)
+
+    # Keep the result for the next run, the answer of a batched AI check is added once the batch is merged
+    def remember_result(answer=None):
+        if content_fingerprints is not None:
+            content_fingerprints.record_outcome(startup_key, "refreshed")
+            if startup_fingerprint is not None and "Page Error" not in full_description:
+                content_fingerprints.put_startup(startup_key, startup_fingerprint, full_description, content_shortener_model, model_name, reasoning_model, Prompts.VERSION, answer)
+
+    try:
+        resumed_stage = next((stage for stage in ["ai_check", "description", "pages", "links"] if stage in checkpoints), None)
+        if resumed_stage is not None:
+            print(f"Resuming {startup_name} after stage: {resumed_stage}")
+            resumed_data = checkpoints[resumed_stage]
+            # Costs paid by the earlier run still count towards this startup
+            startup_costs.restore(resumed_data["token_cost"], resumed_data["saved_token_cost"])
+            final_url = resumed_data["final_url"]
+
+        if resumed_stage == "ai_check":
+            return StartupResult(final_url, resumed_data["full_description"], resumed_data["answer"], startup_costs.get_token_cost(), startup_costs.get_saved_token_cost())
+
+        chat_links_response = checkpoints.get("links", {}).get("links")
+        all_pages_content = checkpoints.get("pages", {}).get("pages_content")
+        full_description = checkpoints.get("description", {}).get("full_description")
+        startup_fingerprint = checkpoints.get("pages", {}).get("startup_fingerprint")
+
+        if resumed_stage is None:
+            final_url, chat_links_response = select_startup_links(web_scraper_obj, startup_costs, prompts_obj, startup_name, url, model_name, link_selection)
+            if chat_links_response is None:
+                return StartupResult(final_url, "Page Error - Website not accessible", "No")
+            # The selection mode is kept so the link ranker can be evaluated against the LLM's picks later
+            checkpoint("links", final_url=final_url, links=chat_links_response, link_selection=link_selection)
+
+        if full_description is None and all_pages_content is None:
+            # Get the content of all the pages
+            all_pages_content, startup_fingerprint = get_pages_contents(web_scraper_obj, startup_costs, chat_links_response, model_name, content_shortener_model, prompts_obj, content_fingerprints)
+            checkpoint("pages", final_url=final_url, pages_content=all_pages_content, startup_fingerprint=startup_fingerprint)
+
+        if full_description is None and content_fingerprints is not None:
+            previous_result = content_fingerprints.get_startup(startup_key, startup_fingerprint, content_shortener_model, model_name, reasoning_model, Prompts.VERSION)
+            if previous_result is not None:
+                full_description, chat_ai_response = previous_result
+                print(f"{startup_name} unchanged since the last run, reusing its description and AI verdict")
+                content_fingerprints.record_outcome(startup_key, "reused")
+                checkpoint("description", final_url=final_url, full_description=full_description)
+                checkpoint("ai_check", final_url=final_url, full_description=full_description, answer=chat_ai_response)
+                return StartupResult(final_url, full_description, chat_ai_response, startup_costs.get_token_cost(), startup_costs.get_saved_token_cost(), startup_costs.get_llm_calls())
+
+        if full_description is None:
             # Get the full description of the startup
-            full_description = get_full_description(web_scraper_obj, all_pages_content, model_name, prompts_obj)
+            full_description = get_full_description(startup_costs, all_pages_content, model_name, prompts_obj)
+            checkpoint("description", final_url=final_url, full_description=full_description)
 
-            # Check if it's an AI company
-            chat_ai_obj = ChatGPT(reasoning_model, prompts_obj.check_ai(full_description), [], OpenAI(api_key=os.getenv("MY_KEY"), max_retries=5))
-            chat_ai_response, input_tokens, output_tokens = chat_ai_obj.chat_model()
-            # Update token cost
-            web_scraper_obj.set_token_cost(input_tokens, output_tokens, reasoning_model)
+        if batch_job is not None:
+            batch_job.add(startup_key, reasoning_model, prompts_obj.check_ai(full_description), ChatGPT.make_structured_params(reasoning_model, AI_Classification_Structure))
+            remember_result()
+            return StartupResult(final_url, full_description, None, startup_costs.get_token_cost(), startup_costs.get_saved_token_cost(), startup_costs.get_llm_calls())
+
+        # Check if it's an AI company
+        chat_ai_obj = ChatGPT(reasoning_model, prompts_obj.check_ai(full_description), [], response_format=AI_Classification_Structure)
+        chat_ai_response, input_tokens, output_tokens = chat_ai_obj.chat_model()
+        # Update token cost
+        startup_costs.record("ai_check", reasoning_model, input_tokens, output_tokens, chat_ai_obj.get_cached_input_tokens(), chat_ai_obj.is_cached())
+        chat_ai_response = get_ai_classification(chat_ai_response, reasoning_model)
+        checkpoint("ai_check", final_url=final_url, full_description=full_description, answer=chat_ai_response)
+        remember_result(chat_ai_response)
+
+        return StartupResult(final_url, full_description, chat_ai_response, startup_costs.get_token_cost(), startup_costs.get_saved_token_cost(), startup_costs.get_llm_calls())
+
+    except Exception as e:
+        print(f"Error processing {startup_name}: {str(e)}")
+        return StartupResult(url, "Page Error - Unexpected error occurred", "No")
+
+
+# Workers pull startups from the shared queue and borrow a warm WebScraper (and Chrome driver) from the pool for each one
+def startup_worker(task_queue, results, results_ready, model_name, content_shortener_model, reasoning_model, browser_pool, cost_ledger, run_manifest, batch_job, link_selection, content_fingerprints):
+    prompts_obj = Prompts(TOTAL_PAGE_CRAWLS)
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
 
-            # Save results
-            save_to_excel_check(output_sheet, output_wb, startup_name, final_url, full_description, chat_ai_response, web_scraper_obj, output_filename)
+        domain_key, startup_row = task
+        print(f"Row {startup_row.row}: {startup_row.name}")
 
+        try:
+            web_scraper_obj = browser_pool.acquire()
         except Exception as e:
-            print(f"Error processing {startup_name}: {str(e)}")
-            save_to_excel_check(output_sheet, output_wb, startup_name, url, 
-                              "Page Error - Unexpected error occurred", "No", web_scraper_obj, output_filename)
+            # Chrome could not be started, the worker carries on with the next startup
+            print(f"Could not start a selenium driver for {startup_row.name}: {e}")
+            with results_ready:
+                results[domain_key] = StartupResult(startup_row.url, "Page Error - Browser could not be started", "No")
+                results_ready.notify_all()
+            continue
 
+        try:
+            result = process_startup(web_scraper_obj, prompts_obj, startup_row.name, startup_row.url, model_name, content_shortener_model, reasoning_model, cost_ledger, run_manifest, batch_job, link_selection, content_fingerprints)
         finally:
-            # --- Finishing calls ---
-            # Reset token cost, redirected URL
-            web_scraper_obj.reset_token_cost()
-            web_scraper_obj.reset_redirect_url()
+            # Health checked by the pool, the driver is only recycled when needed
+            browser_pool.release(web_scraper_obj)
+
+        with results_ready:
+            results[domain_key] = result
+            results_ready.notify_all()
+
+
+# Rows sharing a website are processed once: www. and the path are ignored, so all emails of one domain map to the same key
+def get_domain_key(url):
+    hostname = urlparse(LinkWorker.clean_url(url)).hostname or ""
+    if hostname.startswith("www."):
+        hostname = urlparse(LinkWorker.toggle_www(f"https://{hostname}/")).hostname
+    return hostname.lower()
+
+
+def load_blocked_domains():
+    blocked_domains = set(FREE_MAIL_DOMAINS)
+    if os.path.exists(BLOCKED_DOMAINS_FILE):
+        with open(BLOCKED_DOMAINS_FILE, "r", encoding="utf-8") as blocked_file:
+            blocked_domains.update(line.strip().lower() for line in blocked_file if line.strip())
+    return blocked_domains
+
+
+# Streams the input: drops rows without a URL, already written or on a blocked domain, passes every other row to the writer
+# in input order and queues only the first row of every domain for the workers. Counts the blocked rows into feed_stats,
+# an error reading the input is stored there as "error" and raised again by prompt_approach
+def feed_startup_rows(startup_rows, blocked_domains, run_manifest, task_queue, write_order, workers, feed_stats):
+    try:
+        queued_domains = set()
+        for startup_row in startup_rows:
+            if pd.isnull(startup_row.url):
+                continue
 
-            # Reset the web scraper object after every 8 rows
-            if main_loop_index % 4 == 0:
-                web_scraper_obj.quit_driver()
-                web_scraper_obj = WebScraper()
-                print(f"Resetting the selenium driver")
+            domain_key = get_domain_key(startup_row.url)
+            if domain_key in blocked_domains:
+                feed_stats["blocked_rows"] += 1
+                continue
+
+            # Already in the output of an earlier run
+            if run_manifest is not None and run_manifest.is_written(RunManifest.make_key(startup_row.name, startup_row.url)):
+                continue
 
+            write_order.put((domain_key, startup_row))
+            if domain_key in queued_domains:
+                continue
+
+            queued_domains.add(domain_key)
+            task_queue.put((domain_key, startup_row))
+    except Exception as e:
+        feed_stats["error"] = e
+    finally:
+        write_order.put(None)
+        # One stop signal per worker
+        for _ in range(workers):
+            task_queue.put(None)
+
+
+def prompt_approach(model_name, content_shortener_model, reasoning_model, startup_rows, result_sink, workers=1, page_cache=None, http_fetcher=None, run_manifest=None, blocked_domains=None, batch_job=None, cost_ledger=None, browser_profile="full", link_selection="ranker", content_fingerprints=None, run_report_filename=RUN_REPORT_FILE):
+    if cost_ledger is None:
+        cost_ledger = CostLedger(MODEL_PRICES_FILE)
+    if blocked_domains is None:
+        blocked_domains = load_blocked_domains()
+
+    # Only a few startups per worker wait in the queue at a time, so the input is read while the workers run.
+    # write_order only grows ahead of the writer by rows that are being processed or share a queued row's domain
+    task_queue = queue.Queue(maxsize=workers * 2)
+    write_order = queue.Queue()
+    feed_stats = {"blocked_rows": 0, "error": None}
+    feeder_thread = threading.Thread(target=feed_startup_rows, args=(startup_rows, blocked_domains, run_manifest, task_queue, write_order, workers, feed_stats), daemon=True)
+    feeder_thread.start()
+
+    results = {}
+    results_ready = threading.Condition()
+    browser_pool = BrowserPool(page_cache, http_fetcher, browser_profile)
+    worker_threads = [threading.Thread(target=startup_worker, args=(task_queue, results, results_ready, model_name, content_shortener_model, reasoning_model, browser_pool, cost_ledger, run_manifest, batch_job, link_selection, content_fingerprints), daemon=True) for _ in range(workers)]
+    for worker_thread in worker_threads:
+        worker_thread.start()
+
+    # Workers finish out of order, so results are buffered and written strictly in input-row order.
+    # A domain's result is kept for the rest of the run, a later row of the domain may still follow in the input.
+    # Manifest key of the first (processed) row of every domain, also the batch key of its AI check
+    first_row_keys = {}
+    saved_llm_calls = 0
+    # In batch mode rows are held back until the AI check answers are merged: (startup_row, result, batch key, first row of its domain)
+    pending_rows = []
+    written_rows = 0
+    while True:
+        write_task = write_order.get()
+        if write_task is None:
+            break
+
+        domain_key, startup_row = write_task
+        written_rows += 1
+        with results_ready:
+            while domain_key not in results:
+                if not any(worker_thread.is_alive() for worker_thread in worker_threads):
+                    raise RuntimeError(f"All workers stopped before row {startup_row.row} was processed")
+                results_ready.wait(timeout=5)
+
+            result = results[domain_key]
+
+        first_row = domain_key not in first_row_keys
+        if first_row:
+            first_row_keys[domain_key] = RunManifest.make_key(startup_row.name, startup_row.url)
+        else:
+            # Same website as an earlier row: reuse its result, its cost was already booked on that row
+            print(f"Row {startup_row.row}: {startup_row.name} shares {domain_key}, reusing its result")
+            saved_llm_calls += result.llm_calls
+            result = result._replace(token_cost=0, saved_token_cost=0)
+
+        if batch_job is not None:
+            pending_rows.append((startup_row, result, first_row_keys[domain_key], first_row))
+            continue
 
-def save_to_excel_check(output_sheet, output_wb, startup_name, url, full_description, answer, web_scraper_obj, output_filename):
-    headers = ["Startup Name", "Homepage URL", "Full Description", "Is AI Startup?", "Total Token Cost ($)"]
-    # Write headers if not present
-    if output_sheet.max_row < 2:
-        output_sheet.append(headers)
+        save_to_excel_check(result_sink, startup_row.name, result.url, result.full_description, result.answer, result.token_cost, result.saved_token_cost)
+        if run_manifest is not None:
+            run_manifest.set_stage(RunManifest.make_key(startup_row.name, startup_row.url), "written")
+
+    feeder_thread.join()
+    for worker_thread in worker_threads:
+        worker_thread.join()
+    browser_pool.close()
+    # The rows before the error are written, the run must not look complete
+    if feed_stats["error"] is not None:
+        raise feed_stats["error"]
+
+    if batch_job is not None:
+        write_batch_rows(pending_rows, batch_job, reasoning_model, result_sink, cost_ledger, run_manifest, content_fingerprints)
+
+    print(f"Domain deduplication: {written_rows} rows, {len(first_row_keys)} unique domains, {written_rows - len(first_row_keys)} rows reused another row's result ({saved_llm_calls} LLM calls saved), {feed_stats['blocked_rows']} rows skipped on blocked domains")
+
+    if http_fetcher is not None:
+        tier_stats = http_fetcher.get_tier_stats()
+        tier_hit_rates = http_fetcher.get_tier_hit_rates()
+        print("Page loads by tier: " + ", ".join(f"{tier}: {tier_stats[tier]} ({tier_hit_rates[tier]:.0%})" for tier in tier_stats))
+
+    run_totals = cost_ledger.get_run_totals()
+    print(f"Run cost: ${run_totals['cost']:.4f} for {run_totals['llm_calls']} LLM calls, ${run_totals['saved_cost']:.4f} saved by cached answers")
+    print(f"Boilerplate stripping saved {run_totals['boilerplate_tokens_saved']} input tokens")
+    LLMGateway.get_rate_limiter().print_metrics()
+    RunMetrics.write_report(run_report_filename, cost_ledger, content_fingerprints)
+
+    recycle_reasons = browser_pool.get_recycle_reasons()
+    print("Selenium drivers recycled: " + ", ".join(f"{reason}: {count}" for reason, count in recycle_reasons.items()))
+
+
+# Answer of one batched AI check as (answer, token cost, saved token cost), at batch pricing
+def get_batch_ai_answer(batch_answers, batch_key, reasoning_model, full_description, cost_ledger):
+    if batch_key in batch_answers:
+        answer, input_tokens, output_tokens, cached = batch_answers[batch_key]
+        token_price = cost_ledger.record(batch_key, "ai_check", reasoning_model, input_tokens, output_tokens, cached=cached, batch=True)
+        answer = get_ai_classification(answer, reasoning_model)
+        return (answer, 0, token_price) if cached else (answer, token_price, 0)
+
+    # Failed inside the batch, ask synchronously instead
+    chat_ai_obj = ChatGPT(reasoning_model, Prompts(TOTAL_PAGE_CRAWLS).check_ai(full_description), [], response_format=AI_Classification_Structure)
+    chat_ai_response = chat_ai_obj.chat_model()
+    if chat_ai_response[0] is None:
+        return None, 0, 0
+    answer, input_tokens, output_tokens = chat_ai_response
+    answer = get_ai_classification(answer, reasoning_model)
+    token_price = cost_ledger.record(batch_key, "ai_check", reasoning_model, input_tokens, output_tokens, chat_ai_obj.get_cached_input_tokens(), chat_ai_obj.is_cached())
+    return (answer, 0, token_price) if chat_ai_obj.is_cached() else (answer, token_price, 0)
+
+
+# Submit the queued AI checks, wait for the batch, then write the held back rows in input order
+def write_batch_rows(pending_rows, batch_job, reasoning_model, result_sink, cost_ledger, run_manifest=None, content_fingerprints=None):
+    print(f"Submitting {batch_job.get_request_count()} AI checks as a batch")
+    batch_answers = batch_job.run()
+
+    answers = {}
+    batch_token_cost = 0
+    for startup_row, result, batch_key, first_row in pending_rows:
+        if result.answer is None:
+            if batch_key not in answers:
+                answers[batch_key] = get_batch_ai_answer(batch_answers, batch_key, reasoning_model, result.full_description, cost_ledger)
+            answer, token_cost, saved_token_cost = answers[batch_key]
+            result = result._replace(answer=answer)
+
+            # The cost is booked on the row that was processed, rows reusing its result stay at 0
+            if first_row:
+                if batch_key in batch_answers:
+                    batch_token_cost += token_cost
+                result = result._replace(token_cost=result.token_cost + token_cost, saved_token_cost=result.saved_token_cost + saved_token_cost)
+                if content_fingerprints is not None and answer is not None:
+                    content_fingerprints.set_startup_answer(batch_key, answer)
+                if run_manifest is not None:
+                    run_manifest.set_stage(batch_key, "ai_check", {"final_url": result.url, "full_description": result.full_description, "answer": answer,
+                                                                   "token_cost": result.token_cost, "saved_token_cost": result.saved_token_cost})
+
+        save_to_excel_check(result_sink, startup_row.name, result.url, result.full_description, result.answer, result.token_cost, result.saved_token_cost)
+        if run_manifest is not None:
+            run_manifest.set_stage(RunManifest.make_key(startup_row.name, startup_row.url), "written")
+
+    print(f"Batch AI checks: {len(answers)} answers, ${batch_token_cost:.4f} at batch pricing instead of ${batch_token_cost / CostLedger.BATCH_PRICE_FACTOR:.4f}")
+
+
+def save_to_excel_check(result_sink, startup_name, url, full_description, answer, token_cost, saved_token_cost):
+    headers = ["Startup Name", "Homepage URL", "Full Description", "Is AI Startup?", "Total Token Cost ($)", "Saved Token Cost ($)"]
 
     # Handle page errors
     if "Page Error" in full_description:
         answer = "Uncertain"  # Set to "Uncertain" for page errors
         token_cost = 0  # Set token cost to 0 for page errors
-    else:
-        token_cost = web_scraper_obj.get_token_cost()
+        saved_token_cost = 0
 
     # Write data
-    row = [startup_name, url, full_description, answer, token_cost]
-    output_sheet.append(row)
+    row = [startup_name, url, full_description, answer, token_cost, saved_token_cost]
     
-    # Save after each row
-    output_wb.save(output_filename)
+    # Journal after each row, the sink exports the .xlsx periodically. Headers are written before the first row
+    result_sink.write_row(row, headers)
     print(f"Saved results for {startup_name}")
 
 
-def get_domain_from_email(email):
-    if pd.isnull(email):
-        return None
-    try:
-        return f"https://{email.split('@')[1]}"
-    except:
-        return None
+# startup_rows need name, url and the existing description, e.g. iter_startup_rows(filename, name_col=1, url_col=2, description_col=13).
+# Only the LLM is used, no browser is started
+def check_ai_company(model_name, reasoning_model, startup_rows, result_sink, batch_job=None, cost_ledger=None):
+    if cost_ledger is None:
+        cost_ledger = CostLedger(MODEL_PRICES_FILE)
+
+    if batch_job is not None:
+        # All prompts go into one batch, the rows are written once it is done
+        pending_rows = []
+        prompts_obj = Prompts(TOTAL_PAGE_CRAWLS)
+        for startup_row in startup_rows:
+            if pd.isnull(startup_row.url):
+                continue
+            batch_key = f"row-{startup_row.row}"
+            batch_job.add(batch_key, reasoning_model, prompts_obj.check_ai(startup_row.description), ChatGPT.make_structured_params(reasoning_model, AI_Classification_Structure))
+            pending_rows.append((startup_row, StartupResult(startup_row.url, startup_row.description, None), batch_key, True))
 
-def check_ai_company(model_name, reasoning_model, sheet, output_sheet, output_wb, output_filename):
-    # Initialize the objects
-    web_scraper_obj = WebScraper()
+        write_batch_rows(pending_rows, batch_job, reasoning_model, result_sink, cost_ledger)
+        RunMetrics.write_report(RUN_REPORT_FILE, cost_ledger)
+        return
 
-    for main_loop_index, row in enumerate(range(2, sheet.max_row + 1), start=1):
-        startup_name = sheet.cell(row=row, column=1).value
-        url = sheet.cell(row=row, column=2).value
-        full_description = sheet.cell(row=row, column=13).value
+    for startup_row in startup_rows:
+        startup_name = startup_row.name
+        url = startup_row.url
+        full_description = startup_row.description
 
         if pd.isnull(url):
             continue
 
-        print(f"Row {row}: {startup_name}")
+        print(f"Row {startup_row.row}: {startup_name}")
+        startup_costs = cost_ledger.get_startup(f"row-{startup_row.row}")
 
         prompts_obj = Prompts(TOTAL_PAGE_CRAWLS)
     
-        chat_ai_obj = ChatGPT(reasoning_model, prompts_obj.check_ai(full_description), [], OpenAI(api_key=os.getenv("MY_KEY"), max_retries=5))
+        chat_ai_obj = ChatGPT(reasoning_model, prompts_obj.check_ai(full_description), [], response_format=AI_Classification_Structure)
         chat_ai_response, input_tokens, output_tokens = chat_ai_obj.chat_model()
 
         # Update token cost
-        web_scraper_obj.set_token_cost(input_tokens, output_tokens, reasoning_model)
+        startup_costs.record("ai_check", reasoning_model, input_tokens, output_tokens, chat_ai_obj.get_cached_input_tokens(), chat_ai_obj.is_cached())
+        chat_ai_response = get_ai_classification(chat_ai_response, reasoning_model)
+
+        save_to_excel_check(result_sink, startup_name, url, full_description, chat_ai_response, startup_costs.get_token_cost(), startup_costs.get_saved_token_cost())
+
+    RunMetrics.write_report(RUN_REPORT_FILE, cost_ledger)
+
+
+
+# --- Web UI ---
+# The web tier never runs the pipeline: uploads are queued in Redis, progress is streamed from the job log and the
+# result is served from Redis once a worker (worker.py) has finished the job. Requests therefore stay short.
+# The form only renders the template's hidden fields, the files are posted by JavaScript without a CSRF token
+class UploadForm(FlaskForm):
+    pass
+
+
+@lru_cache(maxsize=1)
+def get_job_queue():
+    return JobQueue.from_env()
+
+
+@app.route("/")
+def index():
+    return render_template("index.html", form=UploadForm(meta={"csrf": False}))
+
 
-        save_to_excel_check(output_sheet, output_wb, startup_name, url, full_description, chat_ai_response, web_scraper_obj, output_filename)
+# file1 is the startup sheet (column 1 names, column 2 website links). file2 is required by the form, the pipeline does not use it
+@app.route("/upload", methods=["POST"])
+def upload():
+    startups_file = request.files.get("file1")
+    use_cases_file = request.files.get("file2")
+    if startups_file is None or not startups_file.filename.lower().endswith(".xlsx"):
+        return jsonify(error="Please upload the startups as an .xlsx file"), 400
+    if use_cases_file is None or not use_cases_file.filename.lower().endswith(".docx"):
+        return jsonify(error="Please upload the AI use cases as a .docx file"), 400
 
-        # --- Finishing calls ---
-        # Reset token cost
-        web_scraper_obj.reset_token_cost()
-        web_scraper_obj.reset_redirect_url()
+    job_id = get_job_queue().enqueue(secure_filename(startups_file.filename) or "startups.xlsx", startups_file.read())
+    return jsonify(message="Files uploaded successfully, processing will start shortly", request_id=job_id)
 
 
+@app.route("/run_process")
+def run_process():
+    job_id = request.args.get("request_id", "")
+    job_queue = get_job_queue()
+
+    def generate_events():
+        if job_queue.get_status(job_id) is None:
+            yield "data: Error: Unknown request ID. Please re-upload files.\n\n"
+            return
+        for message in job_queue.iter_events(job_id, SSE_KEEP_ALIVE_SECONDS):
+            if message is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield "".join(f"data: {line}\n" for line in message.splitlines() or [""]) + "\n"
+
+    return Response(stream_with_context(generate_events()), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/download")
+def download():
+    result = get_job_queue().get_result(request.args.get("request_id", ""))
+    if result is None:
+        return jsonify(error="The results are not available (yet)"), 404
+
+    result_filename, result_bytes = result
+    return send_file(io.BytesIO(result_bytes), as_attachment=True, download_name=result_filename,
+                     mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
+# Latencies, costs and re-crawl counts of a completed job
+@app.route("/report")
+def report():
+    report_bytes = get_job_queue().get_report(request.args.get("request_id", ""))
+    if report_bytes is None:
+        return jsonify(error="The report is not available (yet)"), 404
+    return Response(report_bytes, mimetype="application/json")
 
 
 if __name__ == "__main__":
     startups_file = "Philip.xlsx"
-    sheet = load_startups_excel(startups_file)
-    output_sheet, output_wb = create_results_file()
     output_filename = "PNP Results_output.xlsx"
 
-    # Find the required columns
-    email_col = None
-    startup_name_col = None
-    for col in range(1, sheet.max_column + 1):
-        header = sheet.cell(row=1, column=col).value
-        if header == 'Email':
-            email_col = col
-        elif header == "Startups's business name":
-            startup_name_col = col
-
-    if email_col is None:
-        raise ValueError("Email column not found in the Excel file")
-    if startup_name_col is None:
-        raise ValueError("Startups's business name column not found in the Excel file")
+    # A resumed run keeps the earlier output and skips or continues the startups recorded in the manifest
+    resume = input("Resume the previous run? (y/N): ").strip().lower() == "y"
+    run_manifest = RunManifest(RUN_MANIFEST_FILE, resume=resume)
+    # Rows are journaled as they finish, the .xlsx is exported periodically and at the end
+    result_sink = ResultSink(output_filename, export_interval_seconds=RESULTS_EXPORT_INTERVAL_SECONDS, resume=resume)
+
+    # Re-runs answer byte-identical prompts from the local response cache instead of the API
+    LLMGateway.set_response_cache(ResponseCache(LLM_CACHE_FILE, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES))
+    # Calls of all workers are shaped to stay under the account's rate limits
+    LLMGateway.set_rate_limiter(RateLimiter(LLM_RATE_LIMITS))
+    # Pages crawled recently are served from disk instead of driving Chrome again
+    page_cache = PageCache(PAGE_CACHE_FILE, PAGE_CACHE_MAX_AGE_SECONDS)
+    # Static pages are fetched over plain HTTP, Selenium is only used for JavaScript rendered ones
+    http_fetcher = HttpFetcher()
+    # Startups whose sites did not change since the last run reuse its results
+    content_fingerprints = ContentFingerprints(CONTENT_FINGERPRINTS_FILE)
 
     # Get start and stop indices
     start_index = int(input("Enter start row index (default 2): ") or "2")
-    stop_index = int(input("Enter stop row index (default is last row): ") or str(sheet.max_row))
+    stop_index = input("Enter stop row index (default is last row): ")
+    stop_index = int(stop_index) if stop_index else None
     
     # Validate indices
     if start_index < 2:
         start_index = 2
-    if stop_index > sheet.max_row:
-        stop_index = sheet.max_row
-    if start_index > stop_index:
+    if stop_index is not None and start_index > stop_index:
         raise ValueError("Start index cannot be greater than stop index")
 
-    print(f"Processing rows from {start_index} to {stop_index}")
+    # Number of parallel browser workers, each with its own Chrome driver
+    workers = int(input("Enter number of parallel workers (default 1): ") or "1")
+    if workers < 1:
+        workers = 1
 
-    # Extract URLs from email domains
-    for row in range(start_index, stop_index + 1):
-        email = sheet.cell(row=row, column=email_col).value
-        domain_url = get_domain_from_email(email)
-        if domain_url:
-            sheet.cell(row=row, column=4).value = domain_url  # Store URL in column 4
+    # The text-only profile blocks images, media, fonts and trackers in the browser
+    browser_profile = input("Browser profile, full or text_only (default full): ").strip() or "full"
+    if browser_profile not in Selenium.PROFILES:
+        raise ValueError(f"Unknown browser profile: {browser_profile}")
 
-    prompt_approach(model_name='chatgpt-4o-latest', content_shortener_model='chatgpt-4o-latest', reasoning_model='o3', 
-                  sheet=sheet, output_sheet=output_sheet, output_wb=output_wb, output_filename=output_filename, 
-                  startup_name_col=startup_name_col, start_index=start_index, stop_index=stop_index)
+    link_selection = input(f"Link selection, one of {', '.join(LINK_SELECTION_MODES)} (default ranker): ").strip() or "ranker"
+    if link_selection not in LINK_SELECTION_MODES:
+        raise ValueError(f"Unknown link selection: {link_selection}")
 
-    
-    
+    # The Batch API costs half, but its answers can take up to 24 hours
+    batch_mode = input("Run the AI check through the Batch API? (y/N): ").strip().lower() == "y"
+    batch_job = BatchJob(BATCH_JOB_FILE, poll_interval_seconds=BATCH_POLL_INTERVAL_SECONDS) if batch_mode else None
+
+    print(f"Processing rows from {start_index} to {stop_index or 'the last row'} with {workers} worker(s)")
 
+    # Stream the rows (read-only, the source sheet is not modified), URLs are derived from the email domains
+    startup_rows = iter_startup_rows(startups_file, sheet_name="AISL2025", name_col="Startups's business name", email_col="Email", start_index=start_index, stop_index=stop_index)
 
+    try:
+        prompt_approach(model_name=MODEL_NAME, content_shortener_model=CONTENT_SHORTENER_MODEL, reasoning_model=REASONING_MODEL, 
+                      startup_rows=startup_rows, result_sink=result_sink, 
+                      workers=workers, page_cache=page_cache, http_fetcher=http_fetcher, run_manifest=run_manifest, batch_job=batch_job, browser_profile=browser_profile, link_selection=link_selection, content_fingerprints=content_fingerprints)
+    finally:
+        result_sink.close()
@@ -0,0 +1,109 @@
+# Standard Library
+import os
+import sys
+import tempfile
+import threading
+from contextlib import redirect_stdout
+
+# Local Imports
+from app import *
+
+# Jobs are polled this often, stalled jobs of stopped workers are requeued in between
+JOB_POLL_SECONDS = 5
+HEARTBEAT_INTERVAL_SECONDS = 30
+
+
+# Stand-in for stdout while a job runs: every printed line goes to the job log (and from there to the web UI),
+# and still to the worker's own output
+class JobLog():
+    def __init__(self, job_queue, job_id, stream):
+        self.__job_queue = job_queue
+        self.__job_id = job_id
+        self.__stream = stream
+        self.__lock = threading.Lock()
+        self.__buffer = ""
+
+    def write(self, text):
+        self.__stream.write(text)
+        with self.__lock:
+            self.__buffer += text
+            *lines, self.__buffer = self.__buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                self.__job_queue.publish(self.__job_id, line)
+        return len(text)
+
+    def flush(self):
+        self.__stream.flush()
+
+
+def send_heartbeats(job_queue, job_id, stopped):
+    while not stopped.wait(HEARTBEAT_INTERVAL_SECONDS):
+        job_queue.heartbeat(job_id)
+
+
+# Run the prompt_approach pipeline on an uploaded sheet and store the results sheet and the run report with the job
+def run_job(job_queue, job_id, page_cache, http_fetcher, content_fingerprints):
+    input_filename, input_bytes = job_queue.get_input(job_id)
+    # The metrics are kept for the whole process, the report of a job must only cover that job
+    RunMetrics.reset()
+    http_fetcher.reset_tier_stats()
+    LLMGateway.get_rate_limiter().reset_metrics()
+    content_fingerprints.reset_outcomes()
+
+    stopped = threading.Event()
+    heartbeat_thread = threading.Thread(target=send_heartbeats, args=(job_queue, job_id, stopped), daemon=True)
+    heartbeat_thread.start()
+    try:
+        with tempfile.TemporaryDirectory() as job_dir:
+            startups_file = os.path.join(job_dir, input_filename)
+            output_filename = os.path.join(job_dir, WEB_RESULT_FILENAME)
+            report_filename = os.path.join(job_dir, os.path.basename(RUN_REPORT_FILE))
+            with open(startups_file, "wb") as input_file:
+                input_file.write(input_bytes)
+
+            with redirect_stdout(JobLog(job_queue, job_id, sys.stdout)):
+                print(f"Processing {input_filename}")
+                # Column 1 names, column 2 website links, as described in the web UI
+                startup_rows = iter_startup_rows(startups_file, name_col=1, url_col=2)
+                result_sink = ResultSink(output_filename, export_interval_seconds=RESULTS_EXPORT_INTERVAL_SECONDS)
+                try:
+                    prompt_approach(model_name=MODEL_NAME, content_shortener_model=CONTENT_SHORTENER_MODEL, reasoning_model=REASONING_MODEL,
+                                    startup_rows=startup_rows, result_sink=result_sink, workers=WEB_JOB_WORKERS, page_cache=page_cache,
+                                    http_fetcher=http_fetcher, content_fingerprints=content_fingerprints,
+                                    run_report_filename=report_filename)
+                finally:
+                    result_sink.close()
+
+            with open(output_filename, "rb") as output_file, open(report_filename, "rb") as report_file:
+                job_queue.complete(job_id, WEB_RESULT_FILENAME, output_file.read(), report_file.read())
+    finally:
+        stopped.set()
+        heartbeat_thread.join()
+
+
+# python worker.py, start as many as jobs should run in parallel (docker compose up --scale worker=N)
+if __name__ == "__main__":
+    # Same caches and rate limits as a command line run. The rate limits apply per worker process
+    LLMGateway.set_response_cache(ResponseCache(LLM_CACHE_FILE, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES))
+    LLMGateway.set_rate_limiter(RateLimiter(LLM_RATE_LIMITS))
+    page_cache = PageCache(PAGE_CACHE_FILE, PAGE_CACHE_MAX_AGE_SECONDS)
+    http_fetcher = HttpFetcher()
+    content_fingerprints = ContentFingerprints(CONTENT_FINGERPRINTS_FILE)
+
+    job_queue = JobQueue.from_env()
+    print("Waiting for jobs")
+    while True:
+        for job_id in job_queue.requeue_stalled():
+            print(f"Requeued stalled job {job_id}")
+
+        job_id = job_queue.dequeue(JOB_POLL_SECONDS)
+        if job_id is None:
+            continue
+
+        print(f"Running job {job_id}")
+        try:
+            run_job(job_queue, job_id, page_cache, http_fetcher, content_fingerprints)
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            job_queue.fail(job_id, str(e))